@@ -1,77 +1,131 @@
 import json
 import time
-import random
+import base64
 import os
+import functools
+import collections
+import threading
+import orjson
+import msgpack
 from flask import Flask, jsonify, request, g
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+import maxminddb
 import folium
 
 # --- Configuration (Load Configuration) ---
-CONFIG_FILE = 'storage/settings.json'
-
-def load_config(filepath):
-    """Loads configuration from a JSON file, using defaults if file is missing."""
-    default_config = {
-        "db_path": "storage/logs.db",
-        "model_path": "models/rf_model.pkl",
-        "api_host": "127.0.0.1",
-        "api_port": 5000,
-        "sensitivity": 0.5,
-        "role": "Analyst",
-        "theme": "Dark"
-    }
-    try:
-        with open(filepath, 'r') as f:
-            config = json.load(f)
-            return {**default_config, **config}
-    except Exception as e:
-        print(f"Error loading config: {e}. Using defaults.")
-        return default_config
+try:
+    from .config import CONFIG_PATH as CONFIG_FILE, load_config, get_config
+except ImportError:
+    # Fallback for direct execution (python backend/api.py)
+    from config import CONFIG_PATH as CONFIG_FILE, load_config, get_config
 
 # Global configuration store
-CONFIG = load_config(CONFIG_FILE)
+CONFIG = get_config(CONFIG_FILE)
 
 # --- Flask App Initialization ---
 app = Flask(__name__)
 
 # --- Data Storage (In-memory store for recent data) ---
-LIVE_PACKET_LOG = []
-ALERT_HISTORY = []
-LAST_PACKET_ID = 0
 MAX_LIVE_PACKETS = 50 
+MAX_ALERT_HISTORY = 500
+# Bounded ring buffers: appends are O(1) and old entries are evicted automatically
+LIVE_PACKET_LOG = collections.deque(maxlen=MAX_LIVE_PACKETS)
+ALERT_HISTORY = collections.deque(maxlen=MAX_ALERT_HISTORY)
+LAST_PACKET_ID = 0
+LAST_ALERT_ID = 0
+# Bumped whenever the set of new alerts changes (raised or actioned); see /api/dashboard/bulk
+ALERTS_VERSION = 0
+# Prefix for dashboard section versions, so versions from before an API restart never match
+API_INSTANCE = f"{time.time_ns():x}"
+# Guards the stores above; the API is served by a multi-threaded WSGI server
+STATE_LOCK = threading.Lock()
+# Signalled (with STATE_LOCK held) whenever packets are ingested; wakes /api/traffic/stream clients
+PACKETS_INGESTED = threading.Condition(STATE_LOCK)
+# Idle stream clients get a blank line this often, so dead connections are noticed
+STREAM_HEARTBEAT_SECONDS = 15
+SIMULATED_ATTACK_TYPES = ("DDoS", "Port Scan", "Brute Force")
+# Rendered map HTML, tagged with the LAST_PACKET_ID it was built from
+_MAP_CACHE = {"id": -1, "html": None}
+# Binary wire format used by the sniffer; JSON is still accepted on ingest
+MSGPACK_MIMETYPE = 'application/msgpack'
+GEO_CACHE_SIZE = 4096
+PRIVATE_IP_PREFIXES = ("192.168.", "10.", "172.")
+MAP_RECENT_PACKETS = 20
+
+# --- GeoIP Database (local MaxMind GeoLite2 City, no network lookups) ---
+def load_geoip_reader(filepath):
+    """Opens the local GeoLite2 database, returning None if it is unavailable."""
+    try:
+        return maxminddb.open_database(filepath)
+    except Exception as e:
+        print(f"GeoIP database not available at {filepath}: {e}. Public IPs will show as Unknown.")
+        return None
+
+GEO_READER = load_geoip_reader(CONFIG['geoip_db_path'])
 
 # --- Helper Functions ---
+def ojsonify(obj):
+    """Builds a JSON response using orjson (faster than jsonify for large log lists)."""
+    return app.response_class(orjson.dumps(obj), mimetype="application/json")
+
 def get_live_logs():
     """Retrieves the list of most recent packets."""
-    return LIVE_PACKET_LOG
+    with STATE_LOCK:
+        return list(LIVE_PACKET_LOG)
+
+def summarize_log(log):
+    """Returns a log entry without its raw packet bytes (only the Packet Inspector needs them)."""
+    return {key: value for key, value in log.items() if key != 'raw_data'}
+
+def get_live_logs_since(since):
+    """Returns live packets (without raw_data) newer than since; all of them if since predates an API restart."""
+    with STATE_LOCK:
+        if since > LAST_PACKET_ID:
+            since = 0
+        return [summarize_log(log) for log in LIVE_PACKET_LOG if log['id'] > since]
+
+def _new_alerts():
+    """Alerts still awaiting action. Must be called with STATE_LOCK held."""
+    return [alert for alert in ALERT_HISTORY if alert['status'] == 'New']
 
 def get_alert_history():
     """Retrieves the list of active/recent alerts."""
-    return [alert for alert in ALERT_HISTORY if alert['status'] == 'New']
+    with STATE_LOCK:
+        return _new_alerts()
 
 def get_packet_by_id(packet_id):
     """Retrieves a single, detailed packet by its ID from the live log."""
     packet_id = int(packet_id)
-    for packet in LIVE_PACKET_LOG:
-        if packet.get('id') == packet_id:
-            return packet
+    with STATE_LOCK:
+        for packet in LIVE_PACKET_LOG:
+            if packet.get('id') == packet_id:
+                return packet
     return None
 
+@functools.lru_cache(maxsize=GEO_CACHE_SIZE)
+def _lookup_geolocation(ip):
+    """Cached in-process GeoLite2 lookup."""
+    record = GEO_READER.get(ip) if GEO_READER is not None else None
+    location = (record or {}).get("location")
+    if not location:
+        return {"lat": 0, "lon": 0, "address": "Unknown"}
+    names = [
+        record.get(key, {}).get("names", {}).get("en")
+        for key in ("city", "country")
+    ]
+    address = ", ".join(name for name in names if name) or "Unknown"
+    return {"lat": location.get("latitude", 0), "lon": location.get("longitude", 0), "address": address}
+
 def get_geolocation(ip):
-    """Get latitude and longitude for an IP address using geopy."""
+    """Get latitude and longitude for an IP address from the local GeoIP database."""
+    if not ip:
+        return {"lat": 0, "lon": 0, "address": "Unknown"}
+    # Private ranges are not in the GeoIP database
+    if ip.startswith(PRIVATE_IP_PREFIXES):
+        return {"lat": 37.7749, "lon": -122.4194, "address": "Local Network"}  # San Francisco
     try:
-        geolocator = Nominatim(user_agent="nids_app")
-        location = geolocator.geocode(ip, timeout=5)
-        if location:
-            return {"lat": location.latitude, "lon": location.longitude, "address": location.address}
-        else:
-            # Fallback for common IPs
-            if ip.startswith("192.168.") or ip.startswith("10.") or ip.startswith("172."):
-                return {"lat": 37.7749, "lon": -122.4194, "address": "Local Network"}  # San Francisco
-            return {"lat": 0, "lon": 0, "address": "Unknown"}
-    except (GeocoderTimedOut, GeocoderUnavailable):
-        return {"lat": 0, "lon": 0, "address": "Geolocation Timeout"}
+        return _lookup_geolocation(ip)
+    except Exception:
+        return {"lat": 0, "lon": 0, "address": "Unknown"}
 
 def generate_traffic_map():
     """Generate an HTML map showing traffic flows."""
@@ -82,34 +136,24 @@ def generate_traffic_map():
         m = folium.Map(location=[20, 0], zoom_start=2)
         folium.Marker([20, 0], popup="No traffic data available").add_to(m)
     else:
-        # Create map centered on first IP location
+        recent_logs = logs[-MAP_RECENT_PACKETS:]  # Last 20 packets for performance
         first_ip = logs[0]['src_ip']
-        first_loc = get_geolocation(first_ip)
-        m = folium.Map(location=[first_loc['lat'], first_loc['lon']], zoom_start=2)
 
-        # Track unique IPs and their locations
-        ip_locations = {}
-        traffic_flows = []
+        # Resolve each unique IP once per render; repeats across renders are LRU cache hits
+        unique_ips = {first_ip} | {log[key] for log in recent_logs for key in ('src_ip', 'dst_ip')}
+        locations = {ip: get_geolocation(ip) for ip in unique_ips}
 
-        for log in logs[-20:]:  # Last 20 packets for performance
+        # Create map centered on first IP location
+        first_loc = locations[first_ip]
+        m = folium.Map(location=[first_loc['lat'], first_loc['lon']], zoom_start=2)
+
+        for log in recent_logs:
             src_ip = log['src_ip']
             dst_ip = log['dst_ip']
             classification = log.get('classification', 'Normal')
 
-            # Get or cache locations with exception handling
-            if src_ip not in ip_locations:
-                try:
-                    ip_locations[src_ip] = get_geolocation(src_ip)
-                except Exception:
-                    ip_locations[src_ip] = {"lat": 0, "lon": 0, "address": "Unknown"}
-            if dst_ip not in ip_locations:
-                try:
-                    ip_locations[dst_ip] = get_geolocation(dst_ip)
-                except Exception:
-                    ip_locations[dst_ip] = {"lat": 0, "lon": 0, "address": "Unknown"}
-
-            src_loc = ip_locations[src_ip]
-            dst_loc = ip_locations[dst_ip]
+            src_loc = locations[src_ip]
+            dst_loc = locations[dst_ip]
 
             # Add markers
             color = 'red' if 'anomaly' in classification.lower() else 'blue'
@@ -136,59 +180,68 @@ def generate_traffic_map():
 
     return m._repr_html_()
 
+def simulate_alert(log_entry):
+    """
+    Demo/testing only: raises a synthetic alert for every other ingested packet.
+    Must be called with STATE_LOCK held.
+    
+    Disabled unless "simulate_alerts" is set in settings.json, so normal ingest
+    does no alert work. The gate is deterministic (odd packet IDs).
+    """
+    global LAST_ALERT_ID, ALERTS_VERSION
+    if not CONFIG.get('simulate_alerts') or not (log_entry['id'] & 1):
+        return
+    LAST_ALERT_ID += 1
+    ALERTS_VERSION += 1
+    ALERT_HISTORY.append({
+        "alert_id": LAST_ALERT_ID,
+        "packet_id": log_entry['id'],
+        "timestamp": log_entry['timestamp'],
+        "src_ip": log_entry['src_ip'],
+        "attack_type": SIMULATED_ATTACK_TYPES[LAST_ALERT_ID % len(SIMULATED_ATTACK_TYPES)],
+        "confidence": log_entry.get('confidence', '0.90'),
+        "status": "New"
+    })
+
 # --- NEW: Endpoint to receive packets from the sniffer ---
 @app.route('/api/traffic/ingest', methods=['POST'])
 def ingest_packet():
     """Receives classified packets from the sniffer and adds them to the log."""
-    global LAST_PACKET_ID, LIVE_PACKET_LOG, ALERT_HISTORY
+    global LAST_PACKET_ID
 
     try:
-        data = request.get_json()
+        if request.mimetype == MSGPACK_MIMETYPE:
+            # raw_data arrives as bytes; /api/packet/<id> encodes it on demand
+            data = msgpack.unpackb(request.get_data(), raw=False)
+        else:
+            data = orjson.loads(request.get_data())
 
         if 'logs' in data:
             # Batch ingestion
             ingested_ids = []
-            for log_entry in data['logs']:
-                LAST_PACKET_ID += 1
-                log_entry['id'] = LAST_PACKET_ID
-                LIVE_PACKET_LOG.append(log_entry)
-                ingested_ids.append(LAST_PACKET_ID)
-
-                # For testing purposes, create alerts for approximately half the packets
-                if random.random() < 0.5:
-                    ALERT_HISTORY.append({
-                        "alert_id": len(ALERT_HISTORY) + 1,
-                        "packet_id": LAST_PACKET_ID,
-                        "timestamp": log_entry['timestamp'],
-                        "src_ip": log_entry['src_ip'],
-                        "attack_type": random.choice(["DDoS", "Port Scan", "Brute Force"]),
-                        "confidence": log_entry.get('confidence', '0.90'),
-                        "status": "New"
-                    })
-
-            LIVE_PACKET_LOG = LIVE_PACKET_LOG[-MAX_LIVE_PACKETS:] # Keep memory manageable
+            with STATE_LOCK:
+                for log_entry in data['logs']:
+                    LAST_PACKET_ID += 1
+                    log_entry['id'] = LAST_PACKET_ID
+                    LIVE_PACKET_LOG.append(log_entry)
+                    ingested_ids.append(LAST_PACKET_ID)
+
+                    simulate_alert(log_entry)
+                PACKETS_INGESTED.notify_all()
+
             return jsonify({"message": f"Batch ingested {len(ingested_ids)} packets successfully.", "ids": ingested_ids}), 201
 
         else:
             # Single packet ingestion (fallback)
             packet_data = data
-            LAST_PACKET_ID += 1
-            packet_data['id'] = LAST_PACKET_ID
-            LIVE_PACKET_LOG.append(packet_data)
-            LIVE_PACKET_LOG = LIVE_PACKET_LOG[-MAX_LIVE_PACKETS:]
-
-            if random.random() < 0.5:
-                ALERT_HISTORY.append({
-                    "alert_id": len(ALERT_HISTORY) + 1,
-                    "packet_id": LAST_PACKET_ID,
-                    "timestamp": packet_data['timestamp'],
-                    "src_ip": packet_data['src_ip'],
-                    "attack_type": random.choice(["DDoS", "Port Scan", "Brute Force"]),
-                    "confidence": packet_data.get('confidence', '0.90'),
-                    "status": "New"
-                })
-
-            return jsonify({"message": "Packet ingested successfully.", "id": LAST_PACKET_ID}), 201
+            with STATE_LOCK:
+                LAST_PACKET_ID += 1
+                packet_data['id'] = LAST_PACKET_ID
+                LIVE_PACKET_LOG.append(packet_data)
+                simulate_alert(packet_data)
+                PACKETS_INGESTED.notify_all()
+
+            return jsonify({"message": "Packet ingested successfully.", "id": packet_data['id']}), 201
 
     except Exception as e:
         print(f"Error ingesting packet: {e}")
@@ -201,26 +254,51 @@ def ingest_packet():
 def get_live_traffic():
     """Endpoint for the Live Traffic Monitor."""
     response_data = {
-        "logs": get_live_logs(),
+        # raw_data is served on demand by /api/packet/<id>, not on every poll
+        "logs": [summarize_log(log) for log in get_live_logs()],
         "role": CONFIG['role'],
         "sensitivity": CONFIG['sensitivity']
     }
-    return jsonify(response_data)
+    return ojsonify(response_data)
+
+@app.route('/api/traffic/stream', methods=['GET'])
+def stream_live_traffic():
+    """Pushes live packets newer than ?since=<id> as newline-delimited JSON.
+
+    Each line is one log entry (without raw_data). Blank lines are heartbeats,
+    sent every STREAM_HEARTBEAT_SECONDS while no traffic arrives.
+    """
+    since = request.args.get('since', 0, type=int)
+
+    def generate():
+        last_id = since
+        yield b"\n" # Flushes the response headers so the client sees the stream open
+        while True:
+            with PACKETS_INGESTED:
+                if last_id > LAST_PACKET_ID:
+                    last_id = 0 # Client saw IDs from before an API restart
+                PACKETS_INGESTED.wait_for(lambda: LAST_PACKET_ID > last_id, timeout=STREAM_HEARTBEAT_SECONDS)
+                new_logs = [summarize_log(log) for log in LIVE_PACKET_LOG if log['id'] > last_id]
+
+            if not new_logs:
+                yield b"\n"
+                continue
+            last_id = new_logs[-1]['id']
+            yield b"".join(orjson.dumps(log) + b"\n" for log in new_logs)
+
+    return app.response_class(generate(), mimetype='application/x-ndjson')
 
 @app.route('/api/alerts/history', methods=['GET'])
 def get_alerts_history():
     """Endpoint for the Detection Dashboard."""
-    return jsonify({"alerts": get_alert_history()})
+    return ojsonify({"alerts": get_alert_history()})
 
 
-@app.route('/api/analytics/trends', methods=['GET'])
-def get_analytics_trends():
-    """Endpoint for Analytics & Trends."""
-    logs = get_live_logs()
-    
-    classification_counts = {}
-    protocol_counts = {}
-    ip_counts = {}
+def compute_trends(logs):
+    """Builds the Analytics & Trends breakdowns from a list of live packets."""
+    classification_counts = collections.Counter()
+    protocol_counts = collections.Counter()
+    ip_counts = collections.Counter()
 
     if not logs:
         # FALLBACK: Use a simple mock to ensure the frontend displays something if traffic is zero
@@ -233,22 +311,66 @@ def get_analytics_trends():
             p = log.get("protocol", "Unknown")
             ip = log.get("src_ip", "Unknown")
 
-            classification_counts[c] = classification_counts.get(c, 0) + 1
-            protocol_counts[p] = protocol_counts.get(p, 0) + 1
+            classification_counts[c] += 1
+            protocol_counts[p] += 1
 
             # Count all source IPs, not just anomalous ones
-            ip_counts[ip] = ip_counts.get(ip, 0) + 1
+            ip_counts[ip] += 1
 
-        classification_stats = sorted(classification_counts.items(), key=lambda item: item[1], reverse=True)
-        protocol_stats = sorted(protocol_counts.items(), key=lambda item: item[1], reverse=True)
-        ip_stats = sorted(ip_counts.items(), key=lambda item: item[1], reverse=True)[:10]
+        classification_stats = classification_counts.most_common()
+        protocol_stats = protocol_counts.most_common()
+        ip_stats = ip_counts.most_common(10) # Partial heap selection, no full sort
 
-    response_data = {
+    return {
         "classification_stats": classification_stats,
         "protocol_stats": protocol_stats,
         "ip_stats": ip_stats
     }
-    return jsonify(response_data)
+
+@app.route('/api/analytics/trends', methods=['GET'])
+def get_analytics_trends():
+    """Endpoint for Analytics & Trends."""
+    return ojsonify(compute_trends(get_live_logs()))
+
+
+@app.route('/api/dashboard/bulk', methods=['GET'])
+def get_dashboard_bulk():
+    """Endpoint bundling the dashboard's polled sections into one response.
+
+    ?include= picks the sections (traffic, alerts, trends; all by default).
+    traffic holds the packets newer than ?traffic_since=<id>. alerts and trends
+    carry a "version"; when ?alerts_version= / ?trends_version= already matches
+    it, the section holds only the version and the client keeps what it shows.
+    """
+    include = set(request.args.get('include', 'traffic,alerts,trends').split(','))
+    response_data = {}
+
+    if 'traffic' in include:
+        response_data['traffic'] = {
+            "logs": get_live_logs_since(request.args.get('traffic_since', 0, type=int)),
+            "role": CONFIG['role'],
+            "sensitivity": CONFIG['sensitivity']
+        }
+
+    if 'alerts' in include:
+        with STATE_LOCK:
+            version = f"{API_INSTANCE}-{ALERTS_VERSION}"
+            section = {"version": version}
+            if request.args.get('alerts_version') != version:
+                section['alerts'] = _new_alerts()
+        response_data['alerts'] = section
+
+    if 'trends' in include:
+        with STATE_LOCK:
+            # Trends only depend on the live packet window, which changes only on ingest
+            version = f"{API_INSTANCE}-{LAST_PACKET_ID}"
+            logs = list(LIVE_PACKET_LOG) if request.args.get('trends_version') != version else None
+        section = {"version": version}
+        if logs is not None:
+            section.update(compute_trends(logs))
+        response_data['trends'] = section
+
+    return ojsonify(response_data)
 
 
 @app.route('/api/packet/<int:packet_id>', methods=['GET'])
@@ -257,9 +379,13 @@ def get_packet_details(packet_id):
     packet = get_packet_by_id(packet_id)
 
     if packet:
-        return jsonify({"message": f"Packet {packet_id} found.", "details": packet})
+        raw_data = packet.get('raw_data')
+        if isinstance(raw_data, bytes):
+            # Encode lazily: most packets are never inspected
+            packet = {**packet, 'raw_data': base64.b64encode(raw_data).decode('ascii')}
+        return ojsonify({"message": f"Packet {packet_id} found.", "details": packet})
     else:
-        return jsonify({
+        return ojsonify({
             "message": f"Packet ID {packet_id} not found in recent logs.", 
             "details": None
         }), 404
@@ -270,9 +396,21 @@ def save_settings():
     """Endpoint to update global settings."""
     try:
         data = request.get_json()
-        CONFIG.update(data)
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(CONFIG, f, indent=4)
+        with STATE_LOCK:
+            CONFIG.update(data)
+            # Persist only the keys already in the file plus the ones sent; CONFIG also
+            # carries backend defaults the user never set
+            try:
+                with open(CONFIG_FILE, 'rb') as f:
+                    stored = orjson.loads(f.read())
+            except FileNotFoundError:
+                stored = {}
+            stored.update(data)
+            # Write a sibling file and swap it in, so readers never see a half-written config
+            tmp_path = f"{CONFIG_FILE}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(stored, f, indent=4)
+            os.replace(tmp_path, CONFIG_FILE)
         return jsonify({"message": "Settings saved successfully.", "config": CONFIG})
     except Exception as e:
         return jsonify({"message": f"Failed to save settings: {e}"}), 500
@@ -280,15 +418,18 @@ def save_settings():
 @app.route('/api/alerts/action', methods=['POST'])
 def handle_alert_action():
     """Endpoint to handle alert actions (FP, Block IP)."""
+    global ALERTS_VERSION
     data = request.get_json()
     alert_id = data.get('alert_id')
     action = data.get('action')
     src_ip = data.get('src_ip')
     
-    for alert in ALERT_HISTORY:
-        if alert.get('alert_id') == alert_id:
-            alert['status'] = "Processed" 
-            break
+    with STATE_LOCK:
+        for alert in ALERT_HISTORY:
+            if alert.get('alert_id') == alert_id:
+                alert['status'] = "Processed" 
+                ALERTS_VERSION += 1
+                break
             
     return jsonify({
         "message": f"Action '{action}' processed for Alert ID {alert_id}. Status updated."
@@ -298,7 +439,13 @@ def handle_alert_action():
 def get_traffic_map():
     """Endpoint for the Network Flow Visualization / Geo-IP Map."""
     try:
-        map_html = generate_traffic_map()
+        # Only re-render when new packets have been ingested since the last build
+        packet_id = LAST_PACKET_ID
+        if _MAP_CACHE["id"] != packet_id or _MAP_CACHE["html"] is None:
+            # Tag with the ID seen before rendering, so packets ingested mid-render trigger a rebuild
+            _MAP_CACHE["html"] = generate_traffic_map()
+            _MAP_CACHE["id"] = packet_id
+        map_html = _MAP_CACHE["html"]
         # Return raw HTML with correct content-type for frontend QWebEngineView
         return map_html, 200, {'Content-Type': 'text/html'}
     except Exception as e:
@@ -306,5 +453,8 @@ def get_traffic_map():
 
 
 if __name__ == '__main__':
-    print(f"--- Flask API running on http://{CONFIG['api_host']}:{CONFIG['api_port']} ---")
-    app.run(host=CONFIG['api_host'], port=CONFIG['api_port'], debug=True, use_reloader=False)
+    from waitress import serve
+    threads = CONFIG.get('api_threads', 8)
+    print(f"--- Flask API running on http://{CONFIG['api_host']}:{CONFIG['api_port']} (waitress, {threads} threads) ---")
+    # Production WSGI server: ingest POSTs and UI polls are served concurrently
+    serve(app, host=CONFIG['api_host'], port=CONFIG['api_port'], threads=threads)
@@ -0,0 +1,37 @@
+import functools
+import orjson
+
+# --- Shared Configuration (storage/settings.json) ---
+CONFIG_PATH = 'storage/settings.json'
+
+DEFAULT_CONFIG = {
+    "db_path": "storage/logs.db",
+    "model_path": "models/rf_model.pkl",
+    "api_host": "127.0.0.1",
+    "api_port": 5000,
+    "sensitivity": 0.5,
+    "role": "Analyst",
+    "theme": "Dark",
+    "geoip_db_path": "storage/GeoLite2-City.mmdb",
+    "simulate_alerts": False
+}
+
+def load_config(filepath=CONFIG_PATH):
+    """Loads configuration from a JSON file, using defaults if file is missing."""
+    try:
+        with open(filepath, 'rb') as f:
+            config = orjson.loads(f.read())
+            return {**DEFAULT_CONFIG, **config}
+    except Exception as e:
+        print(f"Error loading config: {e}. Using defaults.")
+        return dict(DEFAULT_CONFIG)
+
+@functools.lru_cache(maxsize=None)
+def get_config(filepath=CONFIG_PATH):
+    """
+    Returns the process-wide configuration for filepath, parsing the file only once.
+    
+    The returned dict is shared: updates made by one module (e.g. the settings
+    endpoint) are visible to every other caller in the same process.
+    """
+    return load_config(filepath)
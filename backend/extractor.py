@@ -1,70 +1,137 @@
-from scapy.all import Packet, IP, TCP, UDP
+import socket
+from scapy.all import Packet, Ether, IP
 
-def extract_features(packet: Packet) -> list:
+# --- Raw Header Layout Constants ---
+ETH_HEADER_LEN = 14
+VLAN_TAG_LEN = 4
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_VLAN = 0x8100
+IP_MIN_HEADER_LEN = 20
+IP_PROTO_TCP = 6
+IP_PROTO_UDP = 17
+TCP_FLAGS_OFFSET = 13
+# Flag letters in bit order, as rendered by Scapy (FIN is bit 0, NS is bit 8)
+TCP_FLAG_NAMES = 'FSRPAUECN'
+# FIN (0x01) | SYN (0x02) | RST (0x04) | ACK (0x10)
+TCP_CRITICAL_FLAGS_MASK = 0x17
+# Lookup table: number of critical flags set for every possible flags byte.
+# Popcount of (flags & mask) precomputed once; a tuple index is cheaper than
+# int.bit_count() in CPython and works on every supported Python version.
+FLAGS_COUNT_LUT = tuple(bin(i & TCP_CRITICAL_FLAGS_MASK).count('1') for i in range(256))
+
+def _ip_header_offset(packet: Packet, raw: bytes):
+    """Returns the byte offset of the IPv4 header in raw, or None if it cannot be located cheaply."""
+    if isinstance(packet, IP):
+        return 0
+    if isinstance(packet, Ether) and len(raw) >= ETH_HEADER_LEN:
+        ethertype = int.from_bytes(raw[12:14], 'big')
+        if ethertype == ETHERTYPE_IPV4:
+            return ETH_HEADER_LEN
+        if ethertype == ETHERTYPE_VLAN and len(raw) >= ETH_HEADER_LEN + VLAN_TAG_LEN:
+            if int.from_bytes(raw[16:18], 'big') == ETHERTYPE_IPV4:
+                return ETH_HEADER_LEN + VLAN_TAG_LEN
+    return None
+
+def _locate_ipv4_header(packet: Packet, raw: bytes):
+    """
+    Finds the IPv4 header for a packet.
+    
+    Returns:
+        A tuple (buffer, offset) where the IPv4 header starts at buffer[offset],
+        or (None, None) if the packet carries no complete IPv4 header.
+    """
+    offset = _ip_header_offset(packet, raw)
+    if offset is None:
+        # Uncommon link layer (e.g. loopback, cooked capture): let Scapy locate the IP header
+        if IP not in packet:
+            return None, None
+        raw, offset = bytes(packet[IP]), 0
+    if len(raw) < offset + IP_MIN_HEADER_LEN or raw[offset] >> 4 != 4:
+        return None, None
+    return raw, offset
+
+def _transport_offset(raw: bytes, offset: int):
+    """Returns the transport header offset, or None for non-first fragments which carry no L4 header."""
+    if int.from_bytes(raw[offset + 6:offset + 8], 'big') & 0x1FFF:
+        return None
+    return offset + (raw[offset] & 0x0F) * 4
+
+def extract_features(packet: Packet, raw: bytes = None) -> list:
     """
     Converts a Scapy packet into a structured feature vector for the ML model.
     
     The feature order must match the training data used in generate_model.py:
     ['protocol', 'length', 'ttl', 'flags_count']
     
+    Header fields are read directly from the packet bytes instead of going
+    through Scapy's layer accessors.
+    
     Args:
         packet: A Scapy packet object.
+        raw: The serialized packet (bytes(packet)); computed if not supplied.
         
     Returns:
         A list of numerical features, or None if the packet is not processable.
     """
-    features = [0, 0, 0, 0] # Initialize with defaults
+    if raw is None:
+        raw = bytes(packet)
     
     # 1. Packet Length (total size)
-    features[1] = len(packet)
+    length = len(raw)
     
     # 2. IP Layer Features (Source/Dest IP are too high-cardinality for this simple model, 
     #    focus on transport/network stats)
-    if IP in packet:
-        ip_layer = packet[IP]
-        features[2] = ip_layer.ttl # TTL
-        
-        # 3. Protocol (TCP=6, UDP=17)
-        features[0] = ip_layer.proto # Protocol number (6 for TCP, 17 for UDP)
+    ip_raw, offset = _locate_ipv4_header(packet, raw)
+    if ip_raw is None:
+        return None
+    ttl = ip_raw[offset + 8] # TTL
+    
+    # 3. Protocol (TCP=6, UDP=17)
+    proto = ip_raw[offset + 9]
 
-        # 4. TCP/UDP Flags (Focus on TCP flags count for anomaly detection)
-        if TCP in packet:
-            tcp_layer = packet[TCP]
-            # Simple count of critical flags (SYN, ACK, FIN, RST)
-            flags_count = (tcp_layer.flags.S + tcp_layer.flags.A + 
-                           tcp_layer.flags.F + tcp_layer.flags.R)
-            features[3] = flags_count
-        elif UDP in packet:
-            # UDP has no flags, count is 0
-            features[3] = 0
-            
-        return features
+    # 4. TCP/UDP Flags (Focus on TCP flags count for anomaly detection)
+    #    UDP has no flags, count is 0
+    flags_count = 0
+    l4_offset = _transport_offset(ip_raw, offset)
+    if proto == IP_PROTO_TCP and l4_offset is not None and len(ip_raw) > l4_offset + TCP_FLAGS_OFFSET:
+        # Simple count of critical flags (SYN, ACK, FIN, RST)
+        flags_count = FLAGS_COUNT_LUT[ip_raw[l4_offset + TCP_FLAGS_OFFSET]]
+        
+    return [proto, length, ttl, flags_count]
 
-    return None
+def _tcp_flags_str(value: int) -> str:
+    """Formats a 9-bit TCP flags value the same way Scapy does (e.g. 'SA')."""
+    return ''.join(name for bit, name in enumerate(TCP_FLAG_NAMES) if value >> bit & 1)
 
-def packet_to_log_data(packet: Packet, classification: int, confidence: float) -> dict:
-    """Extracts human-readable log data from a packet."""
+def packet_to_log_data(packet: Packet, raw: bytes, classification: int, confidence: float) -> dict:
+    """Extracts human-readable log data from a packet and its serialized bytes."""
     log_data = {
         'timestamp': packet.time,
         'src_ip': None,
         'dst_ip': None,
         'protocol': 'Other',
-        'size': len(packet),
+        'size': len(raw),
         'flags': '',
         'classification': 'Anomaly' if classification == 1 else 'Normal',
         'confidence': f'{confidence:.4f}'
     }
 
-    if IP in packet:
-        log_data['src_ip'] = packet[IP].src
-        log_data['dst_ip'] = packet[IP].dst
-        log_data['protocol'] = packet[IP].proto
+    ip_raw, offset = _locate_ipv4_header(packet, raw)
+    if ip_raw is not None:
+        log_data['src_ip'] = socket.inet_ntoa(ip_raw[offset + 12:offset + 16])
+        log_data['dst_ip'] = socket.inet_ntoa(ip_raw[offset + 16:offset + 20])
+        proto = ip_raw[offset + 9]
+        log_data['protocol'] = proto
         
-        if TCP in packet:
-            log_data['protocol'] = 'TCP'
-            log_data['flags'] = str(packet[TCP].flags)
-        elif UDP in packet:
-            log_data['protocol'] = 'UDP'
+        l4_offset = _transport_offset(ip_raw, offset)
+        if l4_offset is not None and len(ip_raw) > l4_offset:
+            if proto == IP_PROTO_TCP:
+                log_data['protocol'] = 'TCP'
+                if len(ip_raw) > l4_offset + TCP_FLAGS_OFFSET:
+                    flags = ((ip_raw[l4_offset + 12] & 0x01) << 8) | ip_raw[l4_offset + TCP_FLAGS_OFFSET]
+                    log_data['flags'] = _tcp_flags_str(flags)
+            elif proto == IP_PROTO_UDP:
+                log_data['protocol'] = 'UDP'
             
     return log_data
 
@@ -1,38 +1,72 @@
-import pickle
+import joblib
 import numpy as np
-import json
+
+try:
+    from .config import CONFIG_PATH, get_config
+except ImportError:
+    # Fallback for direct execution (python backend/ml_engine.py)
+    from config import CONFIG_PATH, get_config
+
+class OnnxModel:
+    """
+    Minimal sklearn-style wrapper around an onnxruntime session.
+    
+    Expects a classifier exported with skl2onnx using zipmap=False, so the
+    session returns (labels, probabilities) as plain tensors.
+    """
+    def __init__(self, model_path):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("onnxruntime is required for .onnx models (pip install onnxruntime)") from e
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Input shape is [batch, n_features]; batch is dynamic
+        if isinstance(model_input.shape[1], int):
+            self.n_features_in_ = model_input.shape[1]
+
+    def predict_with_proba(self, X):
+        """Runs the session once, returning (labels, probabilities)."""
+        labels, probabilities = self.session.run(None, {self.input_name: np.asarray(X, dtype=np.float32)})
+        return labels, probabilities
+
+    def predict(self, X):
+        return self.predict_with_proba(X)[0]
+
+    def predict_proba(self, X):
+        return self.predict_with_proba(X)[1]
 
 class MLEngine:
     """
     Loads a pre-trained ML model and handles real-time inference.
     """
-    def __init__(self, config_path='storage/settings.json'):
+    def __init__(self, config_path=CONFIG_PATH):
         self.model = None
         self.config_path = config_path
         self.model_path = self._load_model_path()
         self._load_model()
 
     def _load_model_path(self):
-        """Loads model path from settings.json."""
-        try:
-            with open(self.config_path, 'r') as f:
-                config = json.load(f)
-                return config.get('model_path', 'models/rf_model.pkl')
-        except Exception as e:
-            print(f"Error loading settings for model path: {e}")
-            return 'models/rf_model.pkl'
+        """Loads model path from the shared settings."""
+        return get_config(self.config_path)['model_path']
 
     def _load_model(self):
-        """Loads the pre-trained model from disk."""  
+        """Loads the pre-trained model from disk and warms it up."""  
         try:
-            with open(self.model_path, 'rb') as f:
-                model_data = pickle.load(f)
+            if self.model_path.endswith('.onnx'):
+                # Native onnxruntime tree kernels, no sklearn dispatch
+                self.model = OnnxModel(self.model_path)
+            else:
+                # Memory-map the tree arrays instead of copying them onto the heap
+                model_data = joblib.load(self.model_path, mmap_mode='r')
                 # Extract the actual model from the dict
                 if isinstance(model_data, dict) and 'model' in model_data:
                     self.model = model_data['model']
                 else:
                     self.model = model_data
             print(f"ML Engine: Successfully loaded model from {self.model_path}")
+            self._warm_up()
         except FileNotFoundError:
             print(f"ML Engine Error: Model file not found at {self.model_path}.")
             print("Please run 'python generate_model.py' first.")
@@ -41,6 +75,20 @@ class MLEngine:
             print(f"ML Engine Error: Failed to load model: {e}")
             self.model = None
 
+    def _warm_up(self):
+        """Runs one dummy prediction so the first live packet does not pay the cold-path cost."""
+        try:
+            n_features = getattr(self.model, 'n_features_in_', 4)
+            self.model.predict(np.zeros((1, n_features), dtype=np.float32))
+        except Exception:
+            pass
+
+    def _infer(self, X):
+        """Returns (labels, probabilities), using a single model call when the backend supports it."""
+        if hasattr(self.model, 'predict_with_proba'):
+            return self.model.predict_with_proba(X)
+        return self.model.predict(X), self.model.predict_proba(X)
+
     def predict(self, features: list) -> tuple:
         """
         Performs real-time classification on the feature vector.
@@ -56,20 +104,52 @@ class MLEngine:
 
         try:
             # Reshape features for model input (1 sample, N features)
-            X = np.array(features).reshape(1, -1)
+            # float32 is the trees' native threshold dtype, so no upcast copy is needed
+            X = np.asarray(features, dtype=np.float32).reshape(1, -1)
             
-            # Classification (0 or 1)
-            classification = self.model.predict(X)[0]
+            # Classification (0 or 1) and per-class probabilities
+            labels, probabilities = self._infer(X)
+            classification = labels[0]
             
             # Confidence/Probability (for the predicted class)
-            probabilities = self.model.predict_proba(X)[0]
-            confidence = probabilities[classification]
+            confidence = probabilities[0][classification]
             
             return int(classification), float(confidence)
             
         except Exception as e:
             print(f"ML Engine Prediction Error: {e}. Input features: {features}")
             return 0, 0.0 # Safe default
+
+    def predict_batch(self, features_list: list) -> tuple:
+        """
+        Classifies many feature vectors in a single model call.
+        
+        Args:
+            features_list: A list or 2-D array of feature vectors (e.g., [[6, 60, 64, 1], ...]).
+            
+        Returns:
+            A tuple (classifications: list of int, confidences: list of float),
+            one entry per input vector.
+        """
+        n_samples = len(features_list) if features_list is not None else 0
+        if self.model is None or n_samples == 0:
+            return [0] * n_samples, [0.0] * n_samples
+
+        try:
+            # Stack all vectors into one (N samples, N features) float32 matrix
+            X = np.asarray(features_list, dtype=np.float32)
+            
+            labels, probabilities = self._infer(X)
+            classifications = np.asarray(labels).astype(int)
+            
+            # Pick the probability of each row's predicted class
+            confidences = probabilities[np.arange(n_samples), classifications]
+            
+            return classifications.tolist(), confidences.astype(float).tolist()
+            
+        except Exception as e:
+            print(f"ML Engine Batch Prediction Error: {e}. Batch size: {n_samples}")
+            return [0] * n_samples, [0.0] * n_samples # Safe default
             
 if __name__ == '__main__':
     # Test the ML engine (requires model to be generated first)
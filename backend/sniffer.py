@@ -1,47 +1,43 @@
 import time
 import requests
-import json
 import logging
 import threading
-import base64
+import itertools
+import queue
+import numpy as np
+import msgpack
+from requests.adapters import HTTPAdapter
 from scapy.all import sniff, IP, TCP, UDP, ICMP, Ether, Packet
 
 # Local module imports
 # Assuming the package structure NIDS_App/backend/
 try:
+    from .config import CONFIG_PATH, get_config
     from .ml_engine import MLEngine
     from .extractor import extract_features, packet_to_log_data
 except ImportError:
     # Fallback for direct execution (python backend/sniffer.py)
+    from config import CONFIG_PATH, get_config
     from ml_engine import MLEngine
     from extractor import extract_features, packet_to_log_data
 
 # --- Configuration (Loaded from settings.json) ---
-CONFIG_PATH = 'storage/settings.json'
-SETTINGS = {}
+CONFIG = get_config(CONFIG_PATH)
+API_URL = f"http://{CONFIG.get('api_host', '127.0.0.1')}:{CONFIG.get('api_port', 5000)}/api/traffic/ingest"
+# Kernel-side BPF filter: non-IPv4 frames (ARP, IPv6, LLDP...) never reach Python
+CAPTURE_FILTER = CONFIG.get('capture_filter', 'ip or (vlan and ip)')
+# Batches are sent as msgpack: cheaper to encode than JSON and carries raw_data as bytes
+INGEST_HEADERS = {'Content-Type': 'application/msgpack'}
 
-def load_settings():
-    """Load configuration settings from JSON file."""
-    global SETTINGS
-    try:
-        with open(CONFIG_PATH, 'r') as f:
-            SETTINGS = json.load(f)
-        return SETTINGS
-    except FileNotFoundError:
-        print(f"Error: Configuration file not found at {CONFIG_PATH}. Using defaults.")
-        SETTINGS = {
-            "api_host": "127.0.0.1",
-            "api_port": 5000,
-            "sensitivity": 0.5
-        }
-        return SETTINGS
-    except Exception as e:
-        print(f"Error loading settings: {e}")
-        return {}
+# --- Console Logging (sampled; keeps stdout writes off the per-packet path) ---
+logger = logging.getLogger("nids.sniffer")
+PACKET_LOG_EVERY = CONFIG.get('packet_log_every', 100) # Log 1 in N packets; 0 disables
+PACKET_COUNTER = itertools.count(1)
 
-# Load settings immediately
-CONFIG = load_settings()
-API_URL = f"http://{CONFIG.get('api_host', '127.0.0.1')}:{CONFIG.get('api_port', 5000)}/api/traffic/ingest"
+# --- HTTP Session (keep-alive connection reused across batches) ---
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0))
+SESSION.headers.update({"Connection": "keep-alive"})
 
 # --- ML Model Initialization ---
 ml_engine = MLEngine()
@@ -49,51 +45,112 @@ ml_engine = MLEngine()
 # --- Global State ---
 LIVE_PACKETS = []
 BATCH_SIZE = 10 
+N_FEATURES = 4 # ['protocol', 'length', 'ttl', 'flags_count'], see extract_features
+# Staging for batched ML inference. Row i of FEATURE_BUFFER holds the features of
+# PENDING_PACKETS[i]; both are only touched from packet_worker_thread.
+PENDING_PACKETS = [] # (packet, raw, features) tuples
+FEATURE_BUFFER = np.empty((BATCH_SIZE, N_FEATURES), dtype=np.float32)
 SEND_INTERVAL = 1 
+PACKET_QUEUE_SIZE = 1024
+# Captured packets handed off from Scapy's receive loop to the processing worker
+PACKET_QUEUE = queue.Queue(maxsize=PACKET_QUEUE_SIZE)
+DROPPED_PACKETS = 0
 last_send_time = time.time()
 lock = threading.Lock()
 
+# --- Packet Capture Hand-off ---
+
+def enqueue_packet(packet: Packet):
+    """
+    Sniff callback: queues the packet without doing any work so capture never stalls.
+    """
+    global DROPPED_PACKETS
+    try:
+        PACKET_QUEUE.put_nowait(packet)
+    except queue.Full:
+        # Worker is behind; shed load here rather than block the capture loop
+        DROPPED_PACKETS += 1
+
+def packet_worker_thread():
+    """Worker thread that drains the capture queue and runs extraction and batched inference."""
+    while True:
+        batch = [PACKET_QUEUE.get()] # Block until traffic arrives
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(PACKET_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+
+        for packet in batch:
+            process_packet(packet)
+        # Classify whatever is left so a quiet link does not hold packets back
+        classify_pending_packets()
+
 # --- Packet Processing and ML Inference ---
 
 def process_packet(packet: Packet):
     """
-    Extracts features, runs ML prediction, and prepares the log entry.
+    Extracts features and stages the packet for batched ML prediction.
     """
-    global LIVE_PACKETS
+    # Serialize once; the extractor, log builder and hex view all read these bytes
+    raw = bytes(packet)
 
     # 1. Feature Extraction
-    features = extract_features(packet)
+    features = extract_features(packet, raw)
     
     if features is None:
         # Ignore non-IP or unprocessable packets
         return
 
-    # 2. ML Prediction
-    # Returns (classification: 0 or 1, confidence: float)
-    classification, confidence = ml_engine.predict(features)
+    # Fill the preallocated buffer in place; no per-batch array is built from lists
+    FEATURE_BUFFER[len(PENDING_PACKETS)] = features
+    PENDING_PACKETS.append((packet, raw, features))
+
+    # Size-triggered flush (buffer full); packet_worker_thread flushes any remainder after each drain
+    if len(PENDING_PACKETS) >= BATCH_SIZE:
+        classify_pending_packets()
+
+def classify_pending_packets():
+    """
+    Runs ML prediction over all staged packets in one batch and prepares the log entries.
+    """
+    if not PENDING_PACKETS:
+        return
+    pending = PENDING_PACKETS[:]
+    PENDING_PACKETS.clear()
+
+    # 2. ML Prediction on a view of the filled rows (no copy)
+    # Returns (classifications: list of 0 or 1, confidences: list of float)
+    classifications, confidences = ml_engine.predict_batch(FEATURE_BUFFER[:len(pending)])
     
-    # 3. Apply Sensitivity Threshold
-    # If confidence in classification 1 (Anomaly) is below the threshold, treat as Normal (0)
     sensitivity = CONFIG.get('sensitivity', 0.5)
-    if classification == 1 and confidence < sensitivity:
-        classification = 0
-        confidence = 1.0 - confidence # Flip confidence to the Normal prediction
+    log_entries = []
+    for (packet, raw, features), classification, confidence in zip(pending, classifications, confidences):
+        # 3. Apply Sensitivity Threshold
+        # If confidence in classification 1 (Anomaly) is below the threshold, treat as Normal (0)
+        if classification == 1 and confidence < sensitivity:
+            classification = 0
+            confidence = 1.0 - confidence # Flip confidence to the Normal prediction
+            
+        # 4. Prepare Log Data
+        log_entry = packet_to_log_data(packet, raw, classification, confidence)
+
+        # Add features for debugging/future logging
+        log_entry['ml_features'] = str(features)
+
+        # Raw packet bytes for the hex view; sent as msgpack bin, no per-packet encoding
+        log_entry['raw_data'] = raw
         
-    # 4. Prepare Log Data
-    log_entry = packet_to_log_data(packet, classification, confidence)
-
-    # Add features for debugging/future logging
-    log_entry['ml_features'] = str(features)
+        log_entries.append(log_entry)
+            
+        # Sampled console feedback; arguments are only formatted if the record is emitted
+        if PACKET_LOG_EVERY and next(PACKET_COUNTER) % PACKET_LOG_EVERY == 0:
+            logger.info("%-15s -> %-15s | Proto: %-3s | %s: %s",
+                        log_entry['src_ip'], log_entry['dst_ip'], log_entry['protocol'],
+                        log_entry['classification'], log_entry['confidence'])
 
-    # Add raw packet data for hex view (base64 encoded for JSON serialization)
-    log_entry['raw_data'] = base64.b64encode(bytes(packet)).decode('ascii')
-    
     with lock:
-        LIVE_PACKETS.append(log_entry)
-        
-    # Log to console for real-time feedback
-    status = f"{log_entry['classification']}: {log_entry['confidence']}"
-    print(f"[{time.strftime('%H:%M:%S')}] {log_entry['src_ip']:<15} -> {log_entry['dst_ip']:<15} | Proto: {log_entry['protocol']:<3} | {status:<20}")
+        LIVE_PACKETS.extend(log_entries)
 
 # --- API Communication ---
 
@@ -114,10 +171,11 @@ def send_traffic_batch():
         # Prepare payload
         payload = {'logs': batch_to_send}
         
-        # Send POST request to the API
-        response = requests.post(
+        # Send POST request to the API (raw_data bytes go over the wire unencoded)
+        response = SESSION.post(
             API_URL, 
-            json=payload, 
+            data=msgpack.packb(payload, use_bin_type=True), 
+            headers=INGEST_HEADERS,
             timeout=1
         )
         response.raise_for_status() # Raise exception for bad status codes (4xx or 5xx)
@@ -140,11 +198,18 @@ def api_sender_thread():
 # --- Main Execution ---
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(message)s", datefmt="%H:%M:%S")
     print("--- NIDS Live Packet Sniffer ---")
     print(f"ML Model loaded. Sensitivity: {CONFIG.get('sensitivity')}")
     print(f"API Target: {API_URL}")
+    print(f"Capture filter: {CAPTURE_FILTER}")
+    print(f"Console packet log: 1 in {PACKET_LOG_EVERY} packets" if PACKET_LOG_EVERY else "Console packet log: disabled")
     print("Starting packet capture. Press Ctrl+C to stop.\n")
 
+    # Start the background thread for packet processing and ML inference
+    worker = threading.Thread(target=packet_worker_thread, daemon=True)
+    worker.start()
+
     # Start the background thread for sending data
     sender = threading.Thread(target=api_sender_thread, daemon=True)
     sender.start()
@@ -152,7 +217,7 @@ if __name__ == '__main__':
     try:
         # Start sniffing packets. This function blocks until interrupted.
         # IF YOU GET PERMISSION ERRORS, TRY RUNNING WITH 'sudo' or as Administrator.
-        sniff(prn=process_packet, store=0)
+        sniff(prn=enqueue_packet, store=0, filter=CAPTURE_FILTER)
         
     except KeyboardInterrupt:
         print("\nSniffer interrupted by user.")
@@ -160,5 +225,8 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"\nAn error occurred during sniffing: {e}")
         print("Hint: Scapy often requires elevated privileges (sudo/Administrator).")
+        print("Hint: BPF filters need libpcap/tcpdump; set \"capture_filter\" to \"\" in settings.json to disable it.")
 
+    if DROPPED_PACKETS:
+        print(f"Dropped {DROPPED_PACKETS} packets because the processing queue was full.")
     print("Sniffer stopped.")
@@ -1,24 +1,62 @@
 import sys
+import os
 import json
 import time
-import requests
+import functools
+import logging
+import dataclasses
 import base64
+import orjson
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QTabWidget, QTableWidget, QTableWidgetItem, QHeaderView,
+    QTabWidget, QTableView, QHeaderView,
     QTextEdit, QLabel, QSlider, QComboBox, QPushButton,
-    QGroupBox, QMessageBox, QFileDialog, QGridLayout
+    QGroupBox, QMessageBox, QFileDialog, QGridLayout,
+    QStyledItemDelegate, QToolTip
 )
-from PyQt5.QtGui import QFont, QPalette, QColor
-from PyQt5.QtCore import QTimer, Qt, QThread, pyqtSignal
-from PyQt5.QtWebEngineWidgets import QWebEngineView
+from PyQt5.QtGui import QFont, QPalette, QColor, QPainter
+from PyQt5.QtCore import (
+    QTimer, Qt, QUrl, QAbstractTableModel, QModelIndex, QRect, QSize, QEvent, pyqtSignal
+)
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
 
 # --- Configuration Constants ---
 API_BASE_URL = "http://127.0.0.1:5000/api"
 
+# Debug output goes through logging (lazy %-formatting, off unless DEBUG is enabled)
+logger = logging.getLogger("nids.ui")
+
+@dataclasses.dataclass
+class AppConfig:
+    """Settings the UI reads; keys the UI does not use (e.g. "role") are left to the backend."""
+    # Declared by hand: dataclass(slots=True) needs Python 3.10. Works because no field has a default
+    __slots__ = ("db_path", "model_path", "api_host", "api_port", "sensitivity", "theme")
+    db_path: str
+    model_path: str
+    api_host: str
+    api_port: int
+    sensitivity: float
+    theme: str
+
+APP_CONFIG_FIELDS = frozenset(field.name for field in dataclasses.fields(AppConfig))
+
 # Function to load configuration safely (copied from backend)
 def load_config(filepath):
-    """Loads configuration from a JSON file, using defaults if file is missing."""
+    """Loads configuration from a JSON file into an AppConfig, using defaults if file is missing.
+
+    The parsed result is cached per file modification time, so the file is only
+    read again after it changes.
+    """
+    try:
+        mtime = os.stat(filepath).st_mtime
+    except OSError:
+        mtime = None # Missing file; the uncached loader reports it and returns defaults
+    merged = _load_config_uncached(filepath, mtime)
+    return AppConfig(**{key: value for key, value in merged.items() if key in APP_CONFIG_FIELDS})
+
+@functools.lru_cache(maxsize=4)
+def _load_config_uncached(filepath, mtime):
+    """Reads and parses the configuration file (mtime is only part of the cache key)."""
     default_config = {
         "db_path": "storage/logs.db",
         "model_path": "models/rf_model.pkl",
@@ -45,43 +83,526 @@ def load_config(filepath):
 CONFIG = load_config('storage/settings.json')
 
 
-# --- Worker Thread for API Calls ---
-class ApiWorker(QThread):
-    """A separate thread to handle API requests asynchronously."""
-    data_ready = pyqtSignal(object)
-    error_signal = pyqtSignal(str)
+def size_columns_once(table, samples, padding=24):
+    """Sizes content-width columns once, from their header label or a sample of their widest value.
+
+    ResizeToContents re-measures every row on each model change; these columns keep the
+    computed width instead (still user-resizable).
+    """
+    header = table.horizontalHeader()
+    metrics = table.fontMetrics()
+    for col, sample in samples.items():
+        header.setSectionResizeMode(col, QHeaderView.Interactive)
+        header.resizeSection(col, max(header.sectionSizeHint(col), metrics.horizontalAdvance(sample) + padding))
+
+
+# --- Theme Styling (built once at import; themes are fixed) ---
+# Modern Dark Theme Palette
+BG_MAIN = QColor(20, 25, 30)        # Deep, main background
+FG_DEFAULT = QColor(220, 225, 230)  # Light gray text
+BASE_CARD = QColor(30, 37, 45)      # Card/Widget background (subtle lift)
+BASE_INPUT = QColor(40, 50, 60)     # Text field/Table cell background
+HIGHLIGHT = QColor(0, 150, 255)     # Primary Highlight (Vibrant Blue)
+RED_ALERT = QColor(255, 80, 80)     # Anomaly/Error color
+
+DARK_QSS = f"""
+    /* Global Font and Spacing */
+    * {{
+        font-family: "Inter", sans-serif;
+        font-size: 10pt;
+        color: {FG_DEFAULT.name()};
+    }}
+
+    /* QMainWindow, Central Widget, and Main Layout */
+    QMainWindow, QWidget#CentralWidget {{
+        background-color: {BG_MAIN.name()};
+    }}
+
+    /* QTabWidget Tabs */
+    QTabWidget::pane {{
+        border: 1px solid {BASE_CARD.name()};
+        background: {BG_MAIN.name()};
+        border-radius: 8px;
+        padding: 5px;
+    }}
+    QTabBar::tab {{
+        background: {BASE_CARD.name()};
+        color: {FG_DEFAULT.name()};
+        border: 1px solid {BASE_CARD.name()};
+        border-bottom-color: {BG_MAIN.name()};
+        padding: 8px 15px;
+        min-width: 100px;
+        font-size: 9pt;
+        border-top-left-radius: 6px;
+        border-top-right-radius: 6px;
+    }}
+    QTabBar::tab:selected {{
+        background: {BG_MAIN.name()};
+        border-bottom: 3px solid {HIGHLIGHT.name()};
+        font-weight: bold;
+        margin-bottom: -1px;
+    }}
+
+    /* QGroupBox titles and borders */
+    QGroupBox {{
+        color: {HIGHLIGHT.name()};
+        border: 1px solid {BASE_CARD.name()};
+        margin-top: 2ex;
+        padding-top: 10px;
+        padding-bottom: 5px;
+        border-radius: 8px;
+        font-weight: bold;
+    }}
+    QGroupBox::title {{
+        subcontrol-origin: margin;
+        subcontrol-position: top center;
+        padding: 0 5px;
+        color: {FG_DEFAULT.name()};
+        font-size: 11pt;
+    }}
+
+    /* QPushButton (Default) */
+    QPushButton {{
+        background-color: {BASE_CARD.name()};
+        border: 1px solid {BASE_INPUT.name()};
+        padding: 8px 15px;
+        border-radius: 6px;
+        font-weight: 500;
+    }}
+    QPushButton:hover {{
+        background-color: {BASE_INPUT.name()};
+    }}
+
+    /* Primary Buttons (Save Settings, Export) */
+    QPushButton#primaryButton {{
+        background-color: {HIGHLIGHT.name()};
+        color: {BG_MAIN.name()};
+        font-weight: bold;
+        border: none;
+    }}
+    QPushButton#primaryButton:hover {{
+        background-color: {HIGHLIGHT.darker(120).name()};
+    }}
+
+    /* Analytics charts keep a fixed-width font so the bars line up */
+    QLabel#ChartLabel {{
+        font-family: "Monospace";
+    }}
+
+    /* QTableView, QTextEdit, QComboBox, QSlider (and the analytics chart labels) */
+    QTableView, QTextEdit, QComboBox, QSlider, QLabel#ChartLabel {{
+        background-color: {BASE_INPUT.name()};
+        border: 1px solid {BASE_CARD.name()};
+        padding: 5px;
+        border-radius: 4px;
+        selection-background-color: {HIGHLIGHT.name()};
+    }}
+
+    /* QComboBox dropdown list */
+    QComboBox QAbstractItemView {{
+        background-color: {BASE_INPUT.name()};
+        color: {FG_DEFAULT.name()};
+        selection-background-color: {HIGHLIGHT.name()};
+        selection-color: {BG_MAIN.name()};
+    }}
+
+    /* Table Items */
+    QTableView::item {{
+        background-color: {BASE_INPUT.name()};
+        color: {FG_DEFAULT.name()};
+        border: none;
+    }}
+
+    /* Table Headers */
+    QHeaderView::section {{
+        background-color: {BASE_CARD.name()};
+        color: {FG_DEFAULT.name()};
+        padding: 8px;
+        border: 1px solid {BG_MAIN.name()};
+        font-weight: bold;
+    }}
+
+    /* Table Grid */
+    QTableView {{
+        gridline-color: {BASE_CARD.name()};
+    }}
+
+    /* QSlider Groove */
+    QSlider::groove:horizontal {{
+        border: 1px solid {BASE_CARD.name()};
+        height: 8px;
+        background: {BASE_CARD.name()};
+        margin: 2px 0;
+        border-radius: 4px;
+    }}
+
+    /* QSlider Handle */
+    QSlider::handle:horizontal {{
+        background: {HIGHLIGHT.name()};
+        border: 1px solid {FG_DEFAULT.name()};
+        width: 16px;
+        margin: -4px 0;
+        border-radius: 8px;
+    }}
+"""
+
+LIGHT_QSS = """
+    /* Global Font and Spacing */
+    * {
+        font-family: "Inter", sans-serif;
+        font-size: 10pt;
+    }
 
-    def __init__(self, url, method='GET', payload=None):
-        super().__init__()
-        self.url = url
-        self.method = method
-        self.payload = payload
+    /* Header Widget Background */
+    QWidget#HeaderWidget {
+        background-color: #f8f9fa;
+    }
+
+    /* Analytics charts keep a fixed-width font so the bars line up */
+    QLabel#ChartLabel {
+        font-family: "Monospace";
+    }
+"""
+
+# --- API Requests (issued on the Qt event loop by QNetworkAccessManager) ---
+API_TIMEOUT_MS = 5000
+# Live traffic is pushed over /traffic/stream; the server sends a heartbeat line every 15 s
+STREAM_TIMEOUT_MS = 20000
+STREAM_RETRY_SECONDS = 10 # While the stream is down, traffic is polled in the bulk request and reconnects are spaced out
+# Dashboard polling backs off while nothing changes: the interval doubles after POLL_IDLE_TICKS
+# unchanged replies, up to POLL_MAX_INTERVAL_MS, and snaps back on new data or user activity
+POLL_INTERVAL_MS = 1000
+POLL_MAX_INTERVAL_MS = 10000
+POLL_IDLE_TICKS = 3
+# Rows kept in the Live Traffic table (matches the API's live packet window)
+MAX_TRAFFIC_ROWS = 50
+BAR_CHAR = "\u2588" # Full block used for the analytics bar charts
+CHART_SCALE = 50 # Length of the longest bar in an analytics chart
+# Every bar body a chart can draw (bar length never exceeds the scale), built once at import
+BAR_BODIES = tuple(BAR_CHAR * length for length in range(CHART_SCALE + 1))
+CHART_RULE = "-" * 30 + "\n"
+# Packet Inspector header breakdown, filled in one format() call per selected packet
+PACKET_HEADER_TEMPLATE = (
+    "<b>Packet ID:</b> {id}<br>"
+    "<b>Timestamp:</b> {timestamp}<br>"
+    "<b>Source IP:</b> {src_ip}<br>"
+    "<b>Dest IP:</b> {dst_ip}<br>"
+    "<b>Protocol:</b> {protocol}<br>"
+    "<b>Size:</b> {size} bytes<br>"
+    "<b>Classification:</b> <span style='color:{color}'>{classification}</span><br>"
+    "<br>--- Detailed Headers (Raw JSON) ---<br>"
+    "<pre>{details_json}</pre>"
+)
 
-    def run(self):
-        try:
-            if self.method == 'GET':
-                response = requests.get(self.url, timeout=5)
-            elif self.method == 'POST':
-                response = requests.post(self.url, json=self.payload, timeout=5)
-            else:
-                self.error_signal.emit(f"Unsupported method: {self.method}")
-                return
 
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+# --- Table Models (views read cells straight from the API dicts; no per-cell items) ---
+class LogTableModel(QAbstractTableModel):
+    """Read-only table model over a list of dicts returned by the API.
+
+    Cell text is formatted once per row when rows arrive, so repaints only index
+    into precomputed tuples.
+    """
+    COLUMNS = () # Dict keys shown, one per column
+    HEADERS = ()
+    CENTERED = frozenset() # Keys whose cells are center-aligned
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._cells = [] # Display strings per row, parallel to _rows
+        self._centered_cols = frozenset(col for col, key in enumerate(self.COLUMNS) if key in self.CENTERED)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def row_at(self, row):
+        """Returns the dict backing a row."""
+        return self._rows[row]
+
+    def display_value(self, row_data, key):
+        return str(row_data.get(key, ''))
+
+    def format_row(self, row_data):
+        """Returns the display strings for one row, in column order."""
+        return tuple(self.display_value(row_data, key) for key in self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.column() >= len(self.COLUMNS):
+            return None
+        if role == Qt.DisplayRole:
+            return self._cells[index.row()][index.column()]
+        if role == Qt.TextAlignmentRole and index.column() in self._centered_cols:
+            return Qt.AlignCenter
+        return None
+
+
+class TrafficModel(LogTableModel):
+    """Append-only model for the Live Traffic table, capped at max_rows."""
+    COLUMNS = ("id", "timestamp", "src_ip", "dst_ip", "protocol", "classification")
+    HEADERS = ("ID", "Timestamp", "Src IP", "Dst IP", "Protocol", "Classification")
+    CENTERED = frozenset(("id", "protocol")) # Center ID and Protocol columns for cleaner look
+    CLASSIFICATION_COL = 5
+
+    def __init__(self, max_rows, parent=None):
+        super().__init__(parent)
+        self.max_rows = max_rows
+        self.anomaly_fg = None
+        self.anomaly_bg = None
+        self._anomalous = [] # Per-row anomaly flag, parallel to _rows
+
+    def set_anomaly_colors(self, fg, bg):
+        """Sets the highlight colors for anomalous rows (called on theme change)."""
+        self.anomaly_fg = fg
+        self.anomaly_bg = bg
+        if self._rows:
+            col = self.CLASSIFICATION_COL
+            self.dataChanged.emit(self.index(0, col), self.index(len(self._rows) - 1, col))
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role in (Qt.ForegroundRole, Qt.BackgroundRole):
+            # Highlight Anomalies
+            if index.column() == self.CLASSIFICATION_COL and self._anomalous[index.row()]:
+                return self.anomaly_fg if role == Qt.ForegroundRole else self.anomaly_bg
+            return None
+        return super().data(index, role)
+
+    def append_logs(self, logs):
+        """Appends new log rows, then drops the oldest rows beyond max_rows."""
+        if not logs:
+            return
+        cells = [self.format_row(log) for log in logs]
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(logs) - 1)
+        self._rows.extend(logs)
+        self._cells.extend(cells)
+        self._anomalous.extend("anomaly" in row[self.CLASSIFICATION_COL].lower() for row in cells)
+        self.endInsertRows()
+
+        excess = len(self._rows) - self.max_rows
+        if excess > 0:
+            self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+            del self._rows[:excess]
+            del self._cells[:excess]
+            del self._anomalous[:excess]
+            self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._cells = []
+        self._anomalous = []
+        self.endResetModel()
+
+
+class AlertModel(LogTableModel):
+    """Model for the Detection Dashboard; shows a placeholder row when empty."""
+    COLUMNS = ("alert_id", "packet_id", "timestamp", "src_ip", "attack_type", "confidence")
+    HEADERS = ("Alert ID", "Packet ID", "Timestamp", "Source IP", "Attack Type", "Confidence", "Action")
+    CENTERED = frozenset(("alert_id", "packet_id", "confidence"))
+    ACTION_COL = 6 # Buttons painted by AlertActionDelegate; the model holds no data here
+    PLACEHOLDER = "No alerts to display"
+
+    def set_alerts(self, alerts):
+        """Brings the model in line with alerts, touching only the rows that changed.
+
+        Rows are matched by alert_id and removed, inserted or refreshed in place. The
+        model is only reset when the order changed or the placeholder row comes or
+        goes. Nothing is signalled when no visible cell changed.
+        """
+        alerts = list(alerts)
+        cells = [self.format_row(alert) for alert in alerts]
+        if cells == self._cells:
+            self._rows = alerts
+            return
 
-            content_type = response.headers.get('Content-Type', '')
-            if 'text/html' in content_type:
-                # Treat as raw HTML (e.g., for /traffic/map)
-                self.data_ready.emit({'map_html': response.text})
-            else:
-                # Treat as JSON for all other endpoints
-                self.data_ready.emit(response.json())
+        new_ids = [alert.get('alert_id') for alert in alerts]
+        old_ids = [alert.get('alert_id') for alert in self._rows]
+        new_set = set(new_ids)
+        old_set = set(old_ids)
+        surviving = [aid for aid in old_ids if aid in new_set]
+        if not surviving or len(new_set) != len(new_ids) or \
+                [aid for aid in new_ids if aid in old_set] != surviving:
+            self._reset(alerts, cells)
+            return
 
-        except requests.exceptions.RequestException as e:
-            error_message = f"API Error: {e}. Ensure the Flask API is running."
-            self.error_signal.emit(error_message)
-        except json.JSONDecodeError:
-            self.error_signal.emit("API Error: Invalid JSON response.")
+        # Bottom-up, so earlier row numbers stay valid
+        for row in range(len(old_ids) - 1, -1, -1):
+            if old_ids[row] not in new_set:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[row]
+                del self._cells[row]
+                self.endRemoveRows()
+
+        # Survivors keep their relative order, so new ids are inserted in runs at their final rows
+        row = 0
+        while row < len(new_ids):
+            if new_ids[row] in old_set:
+                row += 1
+                continue
+            end = row
+            while end + 1 < len(new_ids) and new_ids[end + 1] not in old_set:
+                end += 1
+            self.beginInsertRows(QModelIndex(), row, end)
+            self._rows[row:row] = alerts[row:end + 1]
+            self._cells[row:row] = cells[row:end + 1]
+            self.endInsertRows()
+            row = end + 1
+
+        last_col = len(self.HEADERS) - 1
+        for row, row_cells in enumerate(cells):
+            if self._cells[row] != row_cells:
+                self._cells[row] = row_cells
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_col))
+        self._rows = alerts
+
+    def _reset(self, alerts, cells):
+        self.beginResetModel()
+        self._rows = alerts
+        self._cells = cells
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else max(len(self._rows), 1)
+
+    def has_alerts(self):
+        return bool(self._rows)
+
+    def display_value(self, row_data, key):
+        value = row_data.get(key, '')
+        if key == "confidence":
+            try:
+                return f"{float(value):.2f}"
+            except (TypeError, ValueError):
+                return str(value)
+        return str(value)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not self._rows:
+            if index.isValid() and index.row() == 0 and index.column() == 0:
+                if role == Qt.DisplayRole:
+                    return self.PLACEHOLDER
+                if role == Qt.TextAlignmentRole:
+                    return Qt.AlignCenter
+            return None
+        return super().data(index, role)
+
+
+class AlertActionDelegate(QStyledItemDelegate):
+    """Paints the FP / Block buttons of the Action column and turns clicks into action_clicked.
+
+    The buttons are drawn per paint instead of being real QPushButtons, so no
+    widgets or stylesheets are created per alert row.
+    """
+    action_clicked = pyqtSignal(int, str) # (row, action)
+
+    MARGIN = 5
+    SPACING = 6
+    BUTTON_HEIGHT = 25
+    # (label, action, width, background, hover background, text color)
+    BUTTONS = (
+        ("FP", "false_positive", 40, QColor("#FBBF24"), QColor("#FCD34D"), QColor("black")), # Amber, for caution
+        ("Block", "block_ip", 50, QColor("#E74C3C"), QColor("#C0392B"), QColor("white")),    # Deep Red, destructive
+    )
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._hover = None # (row, action) under the mouse, if any
+        self._font_base = None # View font the cached button font was derived from
+        self._font = None
+        if parent is not None:
+            # Cell events only reach the delegate inside its own column, so the view's
+            # viewport is watched to drop the highlight when the mouse moves elsewhere
+            parent.viewport().installEventFilter(self)
+
+    def button_rects(self, cell_rect):
+        """Yields (QRect, button) for each button laid out left to right in a cell."""
+        x = cell_rect.left() + self.MARGIN
+        y = cell_rect.top() + (cell_rect.height() - self.BUTTON_HEIGHT) // 2
+        for button in self.BUTTONS:
+            width = button[2]
+            yield QRect(x, y, width, self.BUTTON_HEIGHT), button
+            x += width + self.SPACING
+
+    def _button_at(self, cell_rect, pos):
+        for rect, button in self.button_rects(cell_rect):
+            if rect.contains(pos):
+                return button
+        return None
+
+    def _button_font(self, base):
+        """Returns the bold 6pt label font, rebuilt only when the view font changes."""
+        if base != self._font_base:
+            self._font_base = QFont(base)
+            self._font = QFont(base)
+            self._font.setBold(True)
+            self._font.setPointSize(6)
+        return self._font
+
+    def sizeHint(self, option, index):
+        width = 2 * self.MARGIN + sum(b[2] for b in self.BUTTONS) + self.SPACING * (len(self.BUTTONS) - 1)
+        return QSize(width, self.BUTTON_HEIGHT + 2 * self.MARGIN)
+
+    def paint(self, painter, option, index):
+        if not index.model().has_alerts():
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setFont(self._button_font(option.font))
+        painter.setPen(Qt.NoPen)
+        for rect, (label, action, _, background, hover, text_color) in self.button_rects(option.rect):
+            painter.setBrush(hover if self._hover == (index.row(), action) else background)
+            painter.drawRoundedRect(rect, 4, 4)
+            painter.setPen(text_color)
+            painter.drawText(rect, Qt.AlignCenter, label)
+            painter.setPen(Qt.NoPen)
+        painter.restore()
+
+    def _set_hover(self, hover):
+        if hover != self._hover:
+            self._hover = hover
+            self.parent().viewport().update()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Leave:
+            self._set_hover(None)
+        elif event.type() == QEvent.MouseMove:
+            view = self.parent()
+            if view.itemDelegate(view.indexAt(event.pos())) is not self:
+                self._set_hover(None)
+        return super().eventFilter(obj, event)
+
+    def editorEvent(self, event, model, option, index):
+        if not model.has_alerts():
+            return False
+        if event.type() == QEvent.MouseMove:
+            button = self._button_at(option.rect, event.pos())
+            self._set_hover((index.row(), button[1]) if button else None)
+            return False
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            button = self._button_at(option.rect, event.pos())
+            if button:
+                self.action_clicked.emit(index.row(), button[1])
+                return True
+        return False
+
+    def helpEvent(self, event, view, option, index):
+        button = self._button_at(option.rect, event.pos()) if index.model().has_alerts() else None
+        if button is None:
+            return super().helpEvent(event, view, option, index)
+        if button[1] == "false_positive":
+            tip = "Mark as False Positive (Dismiss Alert)"
+        else:
+            tip = f"Simulate Blocking Source IP: {index.model().row_at(index.row()).get('src_ip')}"
+        QToolTip.showText(event.globalPos(), tip, view)
+        return True
 
 
 class NIDSApp(QMainWindow):
@@ -89,9 +610,37 @@ class NIDSApp(QMainWindow):
         super().__init__()
         self.setWindowTitle("NIDS Desktop Monitor")
         self.setGeometry(100, 100, 1400, 800)
-        self.current_sensitivity = CONFIG['sensitivity']
+        self.current_sensitivity = CONFIG.sensitivity
         self.current_packet_details = None # Store selected packet details for export
-        self.current_theme = CONFIG['theme'] # Initialize theme state (now "Light" by default)
+        self._hex_cache = (None, "") # (base64 raw_data, hex dump) of the last packet shown
+        self.current_theme = CONFIG.theme # Initialize theme state (now "Light" by default)
+
+        self._applied_theme = None # Theme whose stylesheet is currently set
+        # Asynchronous HTTP on the event loop; keeps connections alive across polls, no worker threads.
+        # Qt pools 6 connections per host, enough for the stream plus the three guarded polls.
+        self.nam = QNetworkAccessManager(self)
+        self.nam.finished.connect(self._handle_reply)
+        # Outstanding replies -> (on_data, on_error); the reply is routed here when it finishes
+        self._pending_replies = {}
+        # Long-lived /traffic/stream reply (None while disconnected) and its partial trailing line
+        self._stream_reply = None
+        self._stream_buffer = b""
+        self._stream_retry_at = 0.0
+        # Polls still waiting on the API; a tick is skipped while its previous request is in flight
+        self._inflight = {'Dashboard': False, 'TrendsOnDemand': False}
+        # Section versions from the last /dashboard/bulk reply; unchanged sections come back without data
+        self._alerts_version = ""
+        self._trends_version = ""
+        # Backing data for the table views (created before create_tabs builds the views)
+        self.traffic_model = TrafficModel(MAX_TRAFFIC_ROWS, self)
+        self.alert_model = AlertModel(self)
+        # Highest packet ID already shown; the live feed is append-only so only newer rows are added
+        self._last_log_id = 0
+        # The since= each traffic source was last opened with; IDs at or below it mean the API restarted
+        self._traffic_since = 0
+        self._stream_since = 0
+        # Stats last rendered per analytics chart; unchanged charts are neither re-rendered nor re-laid out
+        self._chart_cache = {'cls': None, 'proto': None, 'ip': None}
 
         self.central_widget = QWidget()
         self.central_widget.setObjectName("CentralWidget")
@@ -114,10 +663,11 @@ class NIDSApp(QMainWindow):
         # Connect signal to handle reliable loading when tabs are switched
         self.tabs.currentChanged.connect(self.handle_tab_change)
 
-        # Timer for real-time data updates (1 second interval)
+        # Timer for real-time data updates (1 second interval, backing off while idle)
+        self._idle_polls = 0 # Consecutive bulk replies that carried no new data
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_ui_data)
-        self.timer.start(1000)
+        self.timer.start(POLL_INTERVAL_MS)
 
         # Initial display update (uses theme colors)
         self.update_status_display("Status: Loading...")
@@ -150,14 +700,9 @@ class NIDSApp(QMainWindow):
 
     def apply_theme(self, theme):
         """Applies dark or light theme based on selection, including comprehensive stylesheet."""
-        
-        # Modern Dark Theme Palette
-        BG_MAIN = QColor(20, 25, 30)        # Deep, main background
-        FG_DEFAULT = QColor(220, 225, 230)  # Light gray text
-        BASE_CARD = QColor(30, 37, 45)      # Card/Widget background (subtle lift)
-        BASE_INPUT = QColor(40, 50, 60)     # Text field/Table cell background
-        HIGHLIGHT = QColor(0, 150, 255)     # Primary Highlight (Vibrant Blue)
-        RED_ALERT = QColor(255, 80, 80)     # Anomaly/Error color
+        if theme == self._applied_theme:
+            return # Re-setting the same stylesheet would still re-polish every widget
+        self._applied_theme = theme
 
         if theme == "Dark":
             palette = QPalette()
@@ -172,162 +717,28 @@ class NIDSApp(QMainWindow):
             palette.setColor(QPalette.Highlight, HIGHLIGHT)
             palette.setColor(QPalette.HighlightedText, BG_MAIN)
             self.setPalette(palette)
-            
-            dark_stylesheet = f"""
-                /* Global Font and Spacing */
-                * {{
-                    font-family: "Inter", sans-serif;
-                    font-size: 10pt;
-                    color: {FG_DEFAULT.name()};
-                }}
-
-                /* QMainWindow, Central Widget, and Main Layout */
-                QMainWindow, QWidget#CentralWidget {{
-                    background-color: {BG_MAIN.name()};
-                }}
-
-                /* QTabWidget Tabs */
-                QTabWidget::pane {{
-                    border: 1px solid {BASE_CARD.name()};
-                    background: {BG_MAIN.name()};
-                    border-radius: 8px;
-                    padding: 5px;
-                }}
-                QTabBar::tab {{
-                    background: {BASE_CARD.name()};
-                    color: {FG_DEFAULT.name()};
-                    border: 1px solid {BASE_CARD.name()};
-                    border-bottom-color: {BG_MAIN.name()};
-                    padding: 8px 15px;
-                    min-width: 100px;
-                    font-size: 9pt;
-                    border-top-left-radius: 6px;
-                    border-top-right-radius: 6px;
-                }}
-                QTabBar::tab:selected {{
-                    background: {BG_MAIN.name()};
-                    border-bottom: 3px solid {HIGHLIGHT.name()};
-                    font-weight: bold;
-                    margin-bottom: -1px;
-                }}
-
-                /* QGroupBox titles and borders */
-                QGroupBox {{
-                    color: {HIGHLIGHT.name()};
-                    border: 1px solid {BASE_CARD.name()};
-                    margin-top: 2ex;
-                    padding-top: 10px;
-                    padding-bottom: 5px;
-                    border-radius: 8px;
-                    font-weight: bold;
-                }}
-                QGroupBox::title {{
-                    subcontrol-origin: margin;
-                    subcontrol-position: top center;
-                    padding: 0 5px;
-                    color: {FG_DEFAULT.name()};
-                    font-size: 11pt;
-                }}
-
-                /* QPushButton (Default) */
-                QPushButton {{
-                    background-color: {BASE_CARD.name()};
-                    border: 1px solid {BASE_INPUT.name()};
-                    padding: 8px 15px;
-                    border-radius: 6px;
-                    font-weight: 500;
-                }}
-                QPushButton:hover {{
-                    background-color: {BASE_INPUT.name()};
-                }}
-
-                /* Primary Buttons (Save Settings, Export) */
-                QPushButton#primaryButton {{
-                    background-color: {HIGHLIGHT.name()};
-                    color: {BG_MAIN.name()};
-                    font-weight: bold;
-                    border: none;
-                }}
-                QPushButton#primaryButton:hover {{
-                    background-color: {HIGHLIGHT.darker(120).name()};
-                }}
-
-                /* QTableWidget, QTextEdit, QComboBox, QSlider */
-                QTableWidget, QTextEdit, QComboBox, QSlider {{
-                    background-color: {BASE_INPUT.name()};
-                    border: 1px solid {BASE_CARD.name()};
-                    padding: 5px;
-                    border-radius: 4px;
-                    selection-background-color: {HIGHLIGHT.name()};
-                }}
-
-                /* QComboBox dropdown list */
-                QComboBox QAbstractItemView {{
-                    background-color: {BASE_INPUT.name()};
-                    color: {FG_DEFAULT.name()};
-                    selection-background-color: {HIGHLIGHT.name()};
-                    selection-color: {BG_MAIN.name()};
-                }}
-
-                /* Table Items */
-                QTableWidget::item {{
-                    background-color: {BASE_INPUT.name()};
-                    color: {FG_DEFAULT.name()};
-                    border: none;
-                }}
-
-                /* Table Headers */
-                QHeaderView::section {{
-                    background-color: {BASE_CARD.name()};
-                    color: {FG_DEFAULT.name()};
-                    padding: 8px;
-                    border: 1px solid {BG_MAIN.name()};
-                    font-weight: bold;
-                }}
-
-                /* Table Grid */
-                QTableWidget {{
-                    gridline-color: {BASE_CARD.name()};
-                }}
-
-                /* QSlider Groove */
-                QSlider::groove:horizontal {{
-                    border: 1px solid {BASE_CARD.name()};
-                    height: 8px;
-                    background: {BASE_CARD.name()};
-                    margin: 2px 0;
-                    border-radius: 4px;
-                }}
-
-                /* QSlider Handle */
-                QSlider::handle:horizontal {{
-                    background: {HIGHLIGHT.name()};
-                    border: 1px solid {FG_DEFAULT.name()};
-                    width: 16px;
-                    margin: -4px 0;
-                    border-radius: 8px;
-                }}
-            """
-            self.setStyleSheet(dark_stylesheet)
+            self.setStyleSheet(DARK_QSS)
             
         else: # Light Mode (Reset to system default)
             # Reset palette and clear custom stylesheet to use system defaults
             self.setPalette(QApplication.instance().style().standardPalette())
-            light_stylesheet = f"""
-                /* Global Font and Spacing */
-                * {{
-                    font-family: "Inter", sans-serif;
-                    font-size: 10pt;
-                }}
-
-                /* Header Widget Background */
-                QWidget#HeaderWidget {{
-                    background-color: #f8f9fa;
-                }}
-            """
-            self.setStyleSheet(light_stylesheet)
+            self.setStyleSheet(LIGHT_QSS)
 
         self.current_theme = theme
+
+        # Anomaly row colors for the traffic table and Packet Inspector text colors, built once per theme change
+        if theme == "Dark":
+            self._anomaly_fg = QColor(255, 80, 80) # Vibrant Red
+            self._anomaly_bg = QColor(100, 40, 40) # Brighter red background for better visibility
+            self._anomaly_html_color = '#F87171'
+            self._normal_html_color = '#34D399'
+        else:
+            self._anomaly_fg = QColor(180, 0, 0) # Dark Red for high contrast on light background
+            self._anomaly_bg = QColor(255, 230, 230) # Light Red background for subtle highlight
+            self._anomaly_html_color = '#B91C1C'
+            self._normal_html_color = '#059669'
+        self.traffic_model.set_anomaly_colors(self._anomaly_fg, self._anomaly_bg)
+
         # Re-apply status display to pick up new theme colors
         self.update_status_display(self.status_label.text() or "Status: Loading...")
 
@@ -363,18 +774,35 @@ class NIDSApp(QMainWindow):
         self.main_layout.addWidget(header_widget)
 
     def create_tabs(self):
-        """Sets up all the main tab views."""
+        """Sets up all the main tab views.
+
+        The two tabs fed by the 1-second timer are built eagerly; the others start as
+        empty placeholders and are built on first activation (see _ensure_tab_built).
+        """
         self.create_live_traffic_tab()
         self.create_detection_dashboard_tab()
-        self.create_analytics_tab()
-        self.create_packet_inspector_tab()
-        self.create_settings_tab()
 
         self.tabs.addTab(self.live_traffic_tab, "Live Traffic Monitor")
         self.tabs.addTab(self.detection_dashboard_tab, "Detection Dashboard")
-        self.tabs.addTab(self.analytics_tab, "Analytics & Trends")
-        self.tabs.addTab(self.packet_inspector_tab, "Packet Inspector")
-        self.tabs.addTab(self.settings_tab, "Settings & Tuning")
+
+        # Tab index -> (builder, attribute holding the built tab widget)
+        self._tab_builders = {
+            2: (self.create_analytics_tab, 'analytics_tab'),
+            3: (self.create_packet_inspector_tab, 'packet_inspector_tab'),
+            4: (self.create_settings_tab, 'settings_tab'),
+        }
+        for title in ("Analytics & Trends", "Packet Inspector", "Settings & Tuning"):
+            placeholder = QWidget()
+            QVBoxLayout(placeholder).setContentsMargins(0, 0, 0, 0)
+            self.tabs.addTab(placeholder, title)
+
+    def _ensure_tab_built(self, index):
+        """Builds a lazily created tab into its placeholder the first time it is needed."""
+        if index not in self._tab_builders:
+            return
+        builder, attr = self._tab_builders.pop(index)
+        builder()
+        self.tabs.widget(index).layout().addWidget(getattr(self, attr))
 
     def create_live_traffic_tab(self):
         """Tab 1: Live Traffic Monitor (Table and Chart Placeholder)."""
@@ -383,21 +811,18 @@ class NIDSApp(QMainWindow):
         layout.setContentsMargins(5, 5, 5, 5)
 
         # 1. Live Packet Table
-        self.traffic_table = QTableWidget(0, 6)
-        self.traffic_table.setHorizontalHeaderLabels([
-            "ID", "Timestamp", "Src IP", "Dst IP", "Protocol", "Classification"
-        ])
+        self.traffic_table = QTableView()
+        self.traffic_table.setModel(self.traffic_model)
         
         header = self.traffic_table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeToContents) 
-        header.setSectionResizeMode(1, QHeaderView.ResizeToContents) 
         header.setSectionResizeMode(2, QHeaderView.Stretch)         
         header.setSectionResizeMode(3, QHeaderView.Stretch)         
-        header.setSectionResizeMode(4, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(5, QHeaderView.Stretch)        
+        # ID, Timestamp (epoch seconds from the sniffer) and Protocol
+        size_columns_once(self.traffic_table, {0: "0000000", 1: "0000000000.000000", 4: "Other"})
 
-        self.traffic_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.traffic_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.traffic_table.setSelectionBehavior(QTableView.SelectRows)
+        self.traffic_table.setEditTriggers(QTableView.NoEditTriggers)
         self.traffic_table.clicked.connect(self.handle_packet_selection)
 
         layout.addWidget(self.traffic_table)
@@ -408,19 +833,24 @@ class NIDSApp(QMainWindow):
         layout = QVBoxLayout(self.detection_dashboard_tab)
         layout.setContentsMargins(5, 5, 5, 5)
 
-        self.alert_table = QTableWidget(0, 7)
-        self.alert_table.setHorizontalHeaderLabels([
-            "Alert ID", "Packet ID", "Timestamp", "Source IP", "Attack Type", "Confidence", "Action"
-        ])
+        self.alert_table = QTableView()
+        self.alert_table.setModel(self.alert_model)
+        self.alert_table.verticalHeader().setDefaultSectionSize(35)
+        self.alert_actions = AlertActionDelegate(self.alert_table)
+        self.alert_actions.action_clicked.connect(self._handle_alert_button)
+        self.alert_table.setItemDelegateForColumn(AlertModel.ACTION_COL, self.alert_actions)
+        self.alert_table.setMouseTracking(True) # Hover highlight on the painted buttons
         
         header = self.alert_table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Stretch)
-        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(6, QHeaderView.ResizeToContents) 
-
-        self.alert_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.alert_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        size_columns_once(self.alert_table, {0: "000000", 1: "0000000"}) # Alert ID, Packet ID
+        # The painted buttons have a fixed size
+        header.setSectionResizeMode(AlertModel.ACTION_COL, QHeaderView.Fixed)
+        header.resizeSection(AlertModel.ACTION_COL, max(header.sectionSizeHint(AlertModel.ACTION_COL),
+                                                        self.alert_actions.sizeHint(None, None).width()))
+
+        self.alert_table.setSelectionBehavior(QTableView.SelectRows)
+        self.alert_table.setEditTriggers(QTableView.NoEditTriggers)
         layout.addWidget(self.alert_table)
 
     def create_analytics_tab(self):
@@ -432,17 +862,19 @@ class NIDSApp(QMainWindow):
         chart_area = QHBoxLayout()
         chart_area.setSpacing(15)
 
-        # Helper function for setting up the text editor for charts
+        # Helper function for setting up the label for charts (static rich text needs no editor/document view)
         def create_chart_box(title):
             gb = QGroupBox(title)
             gb.setFont(QFont("Inter", 11, QFont.Bold))
-            text_edit = QTextEdit()
-            text_edit.setReadOnly(True)
-            text_edit.setFont(QFont("Monospace", 9))
-            text_edit.setText("Loading analytics data...")
+            chart_label = QLabel("Loading analytics data...")
+            chart_label.setObjectName("ChartLabel")
+            chart_label.setTextFormat(Qt.RichText)
+            chart_label.setFont(QFont("Monospace", 9))
+            chart_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+            chart_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
             gb.setLayout(QVBoxLayout())
-            gb.layout().addWidget(text_edit)
-            return gb, text_edit
+            gb.layout().addWidget(chart_label)
+            return gb, chart_label
 
         # Group Box 1: Classification Breakdown
         gb1, self.classification_chart = create_chart_box('Classification Breakdown (Normal vs. Anomaly)')
@@ -536,7 +968,7 @@ class NIDSApp(QMainWindow):
         
         # Model Selection (Static for this version)
         ml_layout.addWidget(QLabel("<b>Active ML Model Path:</b>"))
-        model_label = QLabel(f"<i>{CONFIG['model_path']}</i>")
+        model_label = QLabel(f"<i>{CONFIG.model_path}</i>")
         ml_layout.addWidget(model_label)
         
         form_layout.addWidget(ml_group)
@@ -552,7 +984,7 @@ class NIDSApp(QMainWindow):
         user_layout.addWidget(QLabel("UI Theme:"), 0, 0)
         self.theme_combo = QComboBox()
         self.theme_combo.addItems(["Dark", "Light"])
-        self.theme_combo.setCurrentText(CONFIG['theme'])
+        self.theme_combo.setCurrentText(self.current_theme) # Tab may be built after a theme change
         self.theme_combo.currentIndexChanged.connect(lambda: self.apply_theme(self.theme_combo.currentText()))
         user_layout.addWidget(self.theme_combo, 0, 1)
 
@@ -577,9 +1009,12 @@ class NIDSApp(QMainWindow):
     # --- Interaction Handlers for Tabs and Data ---
     def handle_tab_change(self, index):
         """Triggers specific actions when a tab is selected (Reliable loading for Analytics)."""
+        self._ensure_tab_built(index)
+        self._note_poll_activity(True) # The user is looking: poll at full rate again
+
         # Index 2 is "Analytics & Trends"
         if index == 2:
-            print("Analytics tab selected. Triggering on-demand data refresh.")
+            logger.debug("Analytics tab selected. Triggering on-demand data refresh.")
             # Manually trigger a refresh for the analytics data when the tab is opened
             self._start_api_call(
                 url=f"{API_BASE_URL}/analytics/trends",
@@ -589,174 +1024,241 @@ class NIDSApp(QMainWindow):
 
     # --- Data Fetching and Updating ---
     def update_ui_data(self):
-        """Initiates API calls to refresh all tabs (happens every 1 second)."""
-        # 1. Live Data, Alerts, and Config Status
-        self._start_api_call(
-            url=f"{API_BASE_URL}/traffic/live",
-            callback=self._update_live_traffic_data,
-            tag="Traffic"
-        )
+        """Initiates one bulk API call to refresh all tabs (every 1 second, less often while idle)."""
+        if self.isMinimized():
+            return # Nothing is visible; changeEvent polls again on restore
+        # 1. Alert History
+        include = ["alerts"]
+        params = [f"alerts_version={self._alerts_version}"]
+
+        # 2. Live Data and Config Status
+        #    Pushed by the traffic stream; polled only while the stream is down
+        stream_down = self._stream_reply is None
+        if stream_down:
+            include.append("traffic")
+            self._traffic_since = self._last_log_id
+            params.append(f"traffic_since={self._traffic_since}")
+
+        # 3. Analytics, kept current while its tab is showing
+        if self.tabs.currentIndex() == 2:
+            include.append("trends")
+            params.append(f"trends_version={self._trends_version}")
 
-        # 2. Alert History
         self._start_api_call(
-            url=f"{API_BASE_URL}/alerts/history",
-            callback=self._update_alert_data,
-            tag="Alerts"
+            url=f"{API_BASE_URL}/dashboard/bulk?include={','.join(include)}&{'&'.join(params)}",
+            callback=self._update_dashboard_data,
+            tag="Dashboard"
         )
+        if stream_down and time.monotonic() >= self._stream_retry_at:
+            self._open_traffic_stream()
 
     def _start_api_call(self, url, callback, tag):
-        """Helper to start an asynchronous API worker."""
-        worker = ApiWorker(url, method='GET')
-        setattr(self, f'{tag}_worker', worker) 
+        """Helper to start an asynchronous API GET for a polling or on-demand tag."""
+        if tag in self._inflight:
+            if self._inflight[tag]:
+                return # Previous poll for this tag has not returned yet
+            self._inflight[tag] = True
+
+        self._send_request(
+            url,
+            on_data=lambda data: self._finish_api_call(tag, callback, data),
+            on_error=lambda message: self._finish_api_call(tag, self._handle_api_error, message)
+        )
+
+    def _send_request(self, url, on_data, on_error, method='GET', payload=None):
+        """Issues an API request on the event loop; the reply is routed to on_data or on_error."""
+        request = QNetworkRequest(QUrl(url))
+        request.setRawHeader(b"Accept", b"application/json")
+        request.setRawHeader(b"Connection", b"keep-alive")
+        request.setTransferTimeout(API_TIMEOUT_MS)
+
+        if method == 'GET':
+            reply = self.nam.get(request)
+        elif method == 'POST':
+            request.setHeader(QNetworkRequest.ContentTypeHeader, "application/json")
+            reply = self.nam.post(request, orjson.dumps(payload))
+        else:
+            on_error(f"Unsupported method: {method}")
+            return
+
+        self._pending_replies[reply] = (on_data, on_error)
+
+    def _handle_reply(self, reply):
+        """Parses a finished JSON reply and forwards it."""
+        if reply is self._stream_reply:
+            self._close_traffic_stream(reply)
+            return
+        handlers = self._pending_replies.pop(reply, None)
+        if handlers is None:
+            reply.deleteLater() # Cancelled on exit
+            return
+        on_data, on_error = handlers
+        try:
+            if reply.error() != QNetworkReply.NoError:
+                on_error(f"API Error: {reply.errorString()}. Ensure the Flask API is running.")
+                return
 
-        worker.data_ready.connect(callback)
-        worker.error_signal.connect(self._handle_api_error)
-        worker.start()
+            # orjson parses the reply bytes directly
+            try:
+                data = orjson.loads(bytes(reply.readAll()))
+            except orjson.JSONDecodeError:
+                on_error("API Error: Invalid JSON response.")
+                return
+            on_data(data)
+        finally:
+            reply.deleteLater()
+
+    def _open_traffic_stream(self):
+        """Opens the long-lived /traffic/stream request; new packets arrive as JSON lines."""
+        self._stream_since = self._last_log_id
+        request = QNetworkRequest(QUrl(f"{API_BASE_URL}/traffic/stream?since={self._stream_since}"))
+        request.setRawHeader(b"Accept", b"application/x-ndjson")
+        request.setRawHeader(b"Connection", b"keep-alive")
+        # Aborts only if even the heartbeats stop arriving
+        request.setTransferTimeout(STREAM_TIMEOUT_MS)
+        self._stream_buffer = b""
+        self._stream_reply = self.nam.get(request)
+        self._stream_reply.readyRead.connect(self._read_traffic_stream)
+
+    def _read_traffic_stream(self):
+        """Parses the complete lines received so far and appends them to the traffic table."""
+        lines = (self._stream_buffer + bytes(self._stream_reply.readAll())).split(b"\n")
+        self._stream_buffer = lines.pop() # Incomplete last line, kept for the next read
+        try:
+            logs = [orjson.loads(line) for line in lines if line.strip()]
+        except orjson.JSONDecodeError:
+            logger.warning("Malformed traffic stream line; reconnecting.")
+            self._stream_reply.abort()
+            return
+        if logs:
+            self._note_poll_activity(True) # New traffic can raise alerts
+            self._update_live_traffic_data({'logs': logs}, since=self._stream_since)
+
+    def _close_traffic_stream(self, reply):
+        """Falls back to polling when the traffic stream ends (reconnects after STREAM_RETRY_SECONDS)."""
+        if reply.error() not in (QNetworkReply.NoError, QNetworkReply.OperationCanceledError):
+            logger.debug("Traffic stream closed: %s", reply.errorString())
+        self._stream_reply = None
+        self._stream_buffer = b""
+        self._stream_retry_at = time.monotonic() + STREAM_RETRY_SECONDS
+        reply.deleteLater()
+
+    def _note_poll_activity(self, changed):
+        """Resets the poll interval on new data; doubles it after POLL_IDLE_TICKS unchanged replies."""
+        if changed:
+            self._idle_polls = 0
+            interval = POLL_INTERVAL_MS
+        else:
+            self._idle_polls += 1
+            if self._idle_polls < POLL_IDLE_TICKS:
+                return
+            self._idle_polls = 0
+            interval = min(self.timer.interval() * 2, POLL_MAX_INTERVAL_MS)
+        if interval != self.timer.interval():
+            self.timer.setInterval(interval) # Keeps a stopped timer stopped
+
+    def changeEvent(self, event):
+        """Refreshes as soon as the window is restored from being minimized."""
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange and not self.isMinimized() and self.timer.isActive():
+            self._note_poll_activity(True)
+            self.update_ui_data()
+
+    def _finish_api_call(self, tag, handler, result):
+        """Clears the in-flight flag for a tag before forwarding the worker result."""
+        if tag in self._inflight:
+            self._inflight[tag] = False
+        handler(result)
 
     def _handle_api_error(self, message):
         """Displays API connection errors in the status bar."""
-        print(f"DEBUG: API error received: {message}")  # Debug print for API errors
+        logger.warning("API error: %s", message)
         self.update_status_display(f"Status: API Error")
-        print(message)
         if self.timer.isActive():
             if "Ensure the Flask API is running" in message:
                 self.timer.stop()
                 self.show_message("Connection Lost", "Real-time updates stopped due to API error. Please check the backend server.", is_error=True)
 
 
-    def _update_live_traffic_data(self, data):
-        """Updates the Live Traffic table."""
+    def _update_dashboard_data(self, data):
+        """Dispatches the sections of a /dashboard/bulk reply to the per-tab handlers."""
+        self._note_poll_activity(
+            bool(data.get('traffic', {}).get('logs'))
+            or 'alerts' in data.get('alerts', {})
+            or 'classification_stats' in data.get('trends', {})
+        )
+        if 'traffic' in data:
+            self._update_live_traffic_data(data['traffic'], since=self._traffic_since)
+        else:
+            self.update_status_display("Status: OK")
+
+        alerts = data.get('alerts')
+        if alerts is not None:
+            self._alerts_version = alerts.get('version', "")
+            if 'alerts' in alerts:
+                self._update_alert_data(alerts)
+
+        trends = data.get('trends')
+        if trends is not None:
+            self._trends_version = trends.get('version', "")
+            if 'classification_stats' in trends:
+                self._update_analytics_data(trends)
+
+    def _update_live_traffic_data(self, data, since):
+        """Updates the Live Traffic table with logs requested as newer than since."""
 
         self.current_sensitivity = data.get('sensitivity', self.current_sensitivity)
         self.update_status_display("Status: OK") # Update to OK status
 
         logs = data.get('logs', [])
-        print(f"DEBUG: Received logs: {logs}")  # Debug print to check logs data
+        logger.debug("Received logs: %s", logs)
 
         # Logs are now individual entries, no need to flatten
-        flattened_logs = logs
-
-        self.traffic_table.setRowCount(len(flattened_logs))
-
-        # Define anomaly colors based on current theme for text and background
-        if self.current_theme == "Dark":
-             anomaly_text_color = QColor(255, 80, 80) # Vibrant Red
-             anomaly_bg_color = QColor(100, 40, 40) # Brighter red background for better visibility
-        else:
-             anomaly_text_color = QColor(180, 0, 0) # Dark Red for high contrast on light background
-             anomaly_bg_color = QColor(255, 230, 230) # Light Red background for subtle highlight
-
-        for row, log in enumerate(flattened_logs):
-            if not isinstance(log, dict):
-                print(f"Skipping malformed log entry: {log}")
-                continue
-
-            print(f"DEBUG: Processing log entry keys: {list(log.keys())}")  # Debug print keys
-
-            for col, key in enumerate(["id", "timestamp", "src_ip", "dst_ip", "protocol", "classification"]):
-                value = str(log.get(key, ''))
-                print(f"DEBUG: Key: {key}, Value: {value}")  # Debug print key-value
-                item = QTableWidgetItem(value)
-                
-                # Highlight Anomalies
-                is_anomaly = (key == "classification" and "anomaly" in value.lower())
-                
-                if is_anomaly:
-                    item.setForeground(anomaly_text_color)
-                    item.setBackground(anomaly_bg_color)
-                
-                # Center ID and Protocol columns for cleaner look
-                if key in ["id", "protocol"]:
-                     item.setTextAlignment(Qt.AlignCenter)
-
+        flattened_logs = [log for log in logs if isinstance(log, dict)]
+        if not flattened_logs:
+            return # Bulk replies only carry packets newer than the last one shown
+
+        if any(log.get('id', 0) <= since for log in flattened_logs):
+            # The API only resends IDs at or below since after a restart: start the table over.
+            # A batch that is merely late (e.g. a poll overtaken by the stream) is just filtered below
+            self.traffic_model.clear()
+            self._last_log_id = 0
+
+        new_logs = [log for log in flattened_logs if log.get('id', 0) > self._last_log_id]
+        if not new_logs:
+            return
+        self._last_log_id = max(log.get('id', 0) for log in new_logs)
 
-                self.traffic_table.setItem(row, col, item)
+        # One insert (plus one trim of the oldest rows) per tick; the view paints from the model
+        self.traffic_model.append_logs(new_logs)
 
         self.traffic_table.scrollToBottom()
-        self.traffic_table.repaint()
 
 
     def _update_alert_data(self, data):
         """Updates the Detection Dashboard alert table."""
-        print(f"DEBUG: Received alert data: {data}")  # Debug print to check alert data
+        logger.debug("Received alert data: %s", data)
         alerts = data.get('alerts', [])
-        if not alerts:
-            self.alert_table.setRowCount(1)
-            no_alert_item = QTableWidgetItem("No alerts to display")
-            no_alert_item.setTextAlignment(Qt.AlignCenter)
-            self.alert_table.setSpan(0, 0, 1, 7)  # Span across all columns
-            self.alert_table.setItem(0, 0, no_alert_item)
-            # Clear any existing widgets in the last column
-            for row in range(self.alert_table.rowCount()):
-                self.alert_table.setCellWidget(row, 6, None)
-            return
-        
-        self.alert_table.setRowCount(len(alerts))
-        
-        for row, alert in enumerate(alerts):
-            keys = ["alert_id", "packet_id", "timestamp", "src_ip", "attack_type", "confidence"]
-            
-            for col, key in enumerate(keys):
-                value = str(alert.get(key, ''))
-                item = QTableWidgetItem(value)
-                
-                if key == "confidence":
-                    item.setText(f"{float(value):.2f}")
-                    item.setTextAlignment(Qt.AlignCenter)
-                elif key in ["alert_id", "packet_id"]:
-                    item.setTextAlignment(Qt.AlignCenter)
-
-                self.alert_table.setItem(row, col, item)
-
-            # Add Action Buttons in the last column
-            action_widget = QWidget()
-            action_layout = QHBoxLayout(action_widget)
-            action_layout.setContentsMargins(5, 5, 5, 5)
-
-            # Mark False Positive Button (Orange/Yellow for caution)
-            fp_btn = QPushButton("FP")
-            fp_btn.setToolTip("Mark as False Positive (Dismiss Alert)")
-            fp_btn.setFixedSize(40, 25)
-            fp_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #FBBF24; /* Amber */
-                    color: black;
-                    font-weight: bold;
-                    font-size: 6pt;
-                    border-radius: 4px;
-                    border: none;
-                }
-                QPushButton:hover {
-                    background-color: #FCD34D;
-                }
-            """)
-            fp_btn.clicked.connect(lambda _, aid=alert['alert_id']: self.handle_alert_action(aid, "false_positive"))
-            
-            # Block IP Button (Deep Red for destructive action)
-            block_btn = QPushButton("Block")
-            block_btn.setToolTip(f"Simulate Blocking Source IP: {alert['src_ip']}")
-            block_btn.setFixedSize(50, 25)
-            block_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #E74C3C; /* Deep Red */
-                    color: white;
-                    font-weight: bold;
-                    font-size: 6pt;
-                    border-radius: 4px;
-                    border: none;
-                }
-                QPushButton:hover {
-                    background-color: #C0392B;
-                }
-            """)
-            block_btn.clicked.connect(lambda _, aid=alert['alert_id'], ip=alert['src_ip']: self.handle_alert_action(aid, "block_ip", ip))
-
-            action_layout.addWidget(fp_btn)
-            action_layout.addWidget(block_btn)
-            action_layout.addStretch(1)
-
-            self.alert_table.setCellWidget(row, 6, action_widget)
-            self.alert_table.setRowHeight(row, 35)
+        self._fill_alert_table(alerts)
+
+    def _fill_alert_table(self, alerts):
+        """Writes the alert rows into the alert table; the Action column is painted by its delegate."""
+        self.alert_model.set_alerts(alerts)
+        # The span follows the model's empty state: the model starts out empty, so the
+        # first set_alerts([]) changes nothing but the placeholder still needs its span
+        placeholder = not self.alert_model.has_alerts()
+        if placeholder != (self.alert_table.columnSpan(0, 0) > 1):
+            self.alert_table.clearSpans()
+            if placeholder:
+                self.alert_table.setSpan(0, 0, 1, len(AlertModel.HEADERS))  # Placeholder row spans all columns
+
+    def _handle_alert_button(self, row, action):
+        """Dispatches a click on a painted FP / Block button to handle_alert_action."""
+        alert = self.alert_model.row_at(row)
+        if action == "block_ip":
+            self.handle_alert_action(alert['alert_id'], action, alert['src_ip'])
+        else:
+            self.handle_alert_action(alert['alert_id'], action)
 
 
     def _update_analytics_data(self, data):
@@ -766,46 +1268,36 @@ class NIDSApp(QMainWindow):
         protocol_stats = data.get('protocol_stats', [])
         ip_stats = data.get('ip_stats', [])
 
-        self.classification_chart.setHtml(
-            self._render_bar_chart(classification_stats, title="Classification Count", scale=50)
-        )
-        self.protocol_chart.setHtml(
-            self._render_bar_chart(protocol_stats, title="Protocol Traffic", scale=50)
-        )
-        self.ip_chart.setHtml(
-            self._render_bar_chart(ip_stats, title="Top Source IPs", scale=50)
-        )
+        self._set_chart('cls', self.classification_chart, classification_stats, title="Classification Count")
+        self._set_chart('proto', self.protocol_chart, protocol_stats, title="Protocol Traffic")
+        self._set_chart('ip', self.ip_chart, ip_stats, title="Top Source IPs")
 
-    def _update_traffic_map(self, data):
-        """Updates the Network Flow Visualization map."""
-        map_html = data.get('map_html', '<html><body><h3 style="text-align: center; margin-top: 50px;">Map loading...</h3></body></html>')
-        self.map_view.setHtml(map_html)
+    def _set_chart(self, key, widget, stats, title):
+        """Renders and sets a chart only when its stats differ from the ones already shown."""
+        if stats == self._chart_cache[key]:
+            return # Skips the render as well as setText, which re-parses the rich text and re-lays out the label
+        self._chart_cache[key] = stats
+        text = self._render_bar_chart(stats, title=title)
+        widget.setText(f"<pre>{text}</pre>") # <pre> keeps the line breaks and the bar alignment
 
-    def _render_bar_chart(self, stats, title, scale=50):
+    def _render_bar_chart(self, stats, title, scale=CHART_SCALE):
         """Generates an ASCII bar chart from data [(label, count), ...]."""
         if not stats:
             return f"{title} (Last Hour):\n\nNo data available. Ensure the sniffer is running and generating traffic."
 
-        max_count = max(item[1] for item in stats) if stats else 1
-        output = [f"<b>{title}</b> (Last Hour):\n"] # Use HTML bold
-        output.append("-" * 30 + "\n")
-
-        for label, count in stats:
-            label = str(label).ljust(15)
-            # Use a slightly different Unicode block character
-            bar_length = int((count / max_count) * scale)
-            bar = '█' * bar_length
-            output.append(f"{label} {bar} ({count})")
-
-        return "\n".join(output)
+        # `or 1` keeps all-zero stats (e.g. the API's fallback) from dividing by zero
+        max_count = max(count for _, count in stats) or 1
+        rows = [f"{str(label).ljust(15)} {BAR_BODIES[int(count * scale / max_count)]} ({count})" for label, count in stats]
+        return "\n".join([f"<b>{title}</b> (Last Hour):\n", CHART_RULE, *rows]) # Use HTML bold
 
     # --- Packet Inspector Handlers ---
     def handle_packet_selection(self, index):
         """Handles click on the Live Traffic table."""
         row = index.row()
-        packet_id = self.traffic_table.item(row, 0).text()
+        packet_id = self.traffic_model.row_at(row).get('id')
         
         # Switch to Packet Inspector tab
+        self._ensure_tab_built(3)
         self.tabs.setCurrentIndex(3)
         
         # Display loading state while fetching
@@ -832,25 +1324,22 @@ class NIDSApp(QMainWindow):
         details = data['details']
         self.current_packet_details = details
         
-        # Define colors for the breakdown view based on theme
-        anomaly_html_color = '#F87171' if self.current_theme == 'Dark' else '#B91C1C'
-        normal_html_color = '#34D399' if self.current_theme == 'Dark' else '#059669'
-        
-        # Header Breakdown (Formatted String)
-        header_text = f"<b>Packet ID:</b> {details.get('id')}<br>"
-        header_text += f"<b>Timestamp:</b> {details.get('timestamp')}<br>"
-        header_text += f"<b>Source IP:</b> {details.get('src_ip')}<br>"
-        header_text += f"<b>Dest IP:</b> {details.get('dst_ip')}<br>"
-        header_text += f"<b>Protocol:</b> {details.get('protocol')}<br>"
-        header_text += f"<b>Size:</b> {details.get('size')} bytes<br>"
-        
-        # Color the classification text
+        # Color the classification text (colors are set per theme in apply_theme)
         classification = details.get('classification', 'N/A')
-        color = anomaly_html_color if 'anomaly' in classification.lower() else normal_html_color
-        header_text += f"<b>Classification:</b> <span style='color:{color}'>{classification}</span><br>"
-        
-        header_text += "<br>--- Detailed Headers (Raw JSON) ---<br>"
-        header_text += f"<pre>{json.dumps(details, indent=2)}</pre>"
+        color = self._anomaly_html_color if 'anomaly' in classification.lower() else self._normal_html_color
+
+        # Header Breakdown (Formatted String)
+        header_text = PACKET_HEADER_TEMPLATE.format(
+            id=details.get('id'),
+            timestamp=details.get('timestamp'),
+            src_ip=details.get('src_ip'),
+            dst_ip=details.get('dst_ip'),
+            protocol=details.get('protocol'),
+            size=details.get('size'),
+            color=color,
+            classification=classification,
+            details_json=orjson.dumps(details, option=orjson.OPT_INDENT_2).decode()
+        )
 
         self.breakdown_view.setHtml(header_text) 
 
@@ -859,11 +1348,11 @@ class NIDSApp(QMainWindow):
         if raw_data is None:
             self.hex_view.setText("No raw data available.")
         elif isinstance(raw_data, str):
-            # Decode base64 string to bytes, then to hex
+            # Decode base64 string to bytes, then to hex (reused when the same packet is selected again)
             try:
-                decoded_bytes = base64.b64decode(raw_data)
-                hex_str = ' '.join(f"{b:02X}" for b in decoded_bytes)
-                self.hex_view.setText(hex_str)
+                if self._hex_cache[0] != raw_data:
+                    self._hex_cache = (raw_data, base64.b64decode(raw_data).hex(' ').upper())
+                self.hex_view.setText(self._hex_cache[1])
             except Exception as e:
                 self.hex_view.setText(f"Error decoding raw data: {e}")
         else:
@@ -883,8 +1372,8 @@ class NIDSApp(QMainWindow):
         
         if fileName:
             try:
-                with open(fileName, 'w') as f:
-                    json.dump(self.current_packet_details, f, indent=4)
+                with open(fileName, 'wb') as f:
+                    f.write(orjson.dumps(self.current_packet_details, option=orjson.OPT_INDENT_2))
                 self.show_message("Export Successful", f"Packet details saved to:\n{fileName}")
             except Exception as e:
                 self.show_message("Export Error", f"Failed to save file: {e}", is_error=True)
@@ -892,6 +1381,7 @@ class NIDSApp(QMainWindow):
 
     def save_settings(self):
         """Gathers settings and sends them to the API to be saved."""
+        self._ensure_tab_built(4) # Settings controls are created with the tab
         new_sensitivity = self.sensitivity_slider.value() / 100.0
         new_theme = self.theme_combo.currentText()
 
@@ -901,16 +1391,17 @@ class NIDSApp(QMainWindow):
         }
 
         self.current_theme = new_theme # Update theme locally before API call returns
+        CONFIG.sensitivity = new_sensitivity
+        CONFIG.theme = new_theme
         self.apply_theme(new_theme) # Re-apply theme immediately
 
-        self.settings_worker = ApiWorker(
+        self._send_request(
             url=f"{API_BASE_URL}/settings",
+            on_data=lambda data: self.show_message("Settings Saved", data.get('message', 'Configuration updated successfully.')),
+            on_error=lambda err: self.show_message("Error Saving Settings", err, is_error=True),
             method='POST',
             payload=settings_payload
         )
-        self.settings_worker.data_ready.connect(lambda data: self.show_message("Settings Saved", data.get('message', 'Configuration updated successfully.')))
-        self.settings_worker.error_signal.connect(lambda err: self.show_message("Error Saving Settings", err, is_error=True))
-        self.settings_worker.start()
 
 
     def handle_alert_action(self, alert_id, action_type, source_ip=None):
@@ -933,26 +1424,26 @@ class NIDSApp(QMainWindow):
                 "src_ip": source_ip
             }
 
-            self.alert_action_worker = ApiWorker(
+            self._send_request(
                 url=f"{API_BASE_URL}/alerts/action",
+                on_data=lambda data: self.show_message("Action Success", data.get('message', 'Alert status updated.')),
+                on_error=lambda err: self.show_message("Action Failed", err, is_error=True),
                 method='POST',
                 payload=action_payload
             )
-            self.alert_action_worker.data_ready.connect(lambda data: self.show_message("Action Success", data.get('message', 'Alert status updated.')))
-            self.alert_action_worker.error_signal.connect(lambda err: self.show_message("Action Failed", err, is_error=True))
-            self.alert_action_worker.start()
         else:
             self.show_message("Action Cancelled", "The user action was cancelled.")
 
     def closeEvent(self, event):
-        """Handle application close event to properly terminate running threads."""
-        # Wait for any running workers to finish
-        workers_to_wait = ['settings_worker', 'alert_action_worker', 'Traffic_worker', 'Alerts_worker', 'TrendsOnDemand_worker', 'PacketInspector_worker']
-        for worker_name in workers_to_wait:
-            if hasattr(self, worker_name):
-                worker = getattr(self, worker_name)
-                if worker.isRunning():
-                    worker.wait(1000)  # Wait up to 1 second for thread to finish
+        """Handle application close event to stop polling and drop outstanding requests."""
+        self.timer.stop()
+        # Forget the handlers first so cancelled requests raise no error dialogs
+        replies = list(self._pending_replies)
+        self._pending_replies.clear()
+        for reply in replies:
+            reply.abort()
+        if self._stream_reply is not None:
+            self._stream_reply.abort()
         event.accept()
 
 
@@ -969,6 +1460,7 @@ class NIDSApp(QMainWindow):
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(name)s: %(message)s", datefmt="%H:%M:%S")
     print("--- NIDS Frontend Starting ---")
     print("Ensure the following are running in separate terminals:")
     print("1. Sniffer: python backend/sniffer.py")
@@ -1,7 +1,7 @@
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-import pickle
+import joblib
 import os
 import numpy as np
 
@@ -13,16 +13,40 @@ SNIFFER_FEATURES = [
     'protocol_TCP', 'protocol_UDP', 'protocol_ICMP'
 ]
 
+# IP protocol numbers behind the one-hot protocol features, in SNIFFER_FEATURES order
+PROTOCOL_ONEHOT = {'protocol_TCP': 6, 'protocol_UDP': 17, 'protocol_ICMP': 1}
+
 # --- FILE PATHS ---
 MODEL_FILENAME = 'rf_model.pkl'
 MODEL_PATH = os.path.join('models', MODEL_FILENAME)
 MODEL_DIR = 'models'
+ONNX_MODEL_PATH = os.path.join('models', 'rf_model.onnx')
 
 # NOTE: ADJUST THIS PATH TO YOUR DOWNLOADED CSV FILE
 # Assuming your main training CSV is named 'NF-UNSW-NB15.csv'
 DATASET_FILENAME = 'NF-UNSW-NB15.csv'
 DATASET_PATH = os.path.join(os.path.dirname(__file__), DATASET_FILENAME)
 
+def export_onnx(model, n_features, path=ONNX_MODEL_PATH):
+    """Exports the trained model to ONNX for onnxruntime inference (optional: needs skl2onnx)."""
+    try:
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+    except ImportError:
+        print("skl2onnx not installed; skipping ONNX export (pip install skl2onnx onnxruntime).")
+        return False
+
+    # zipmap=False keeps probabilities as a plain [N, n_classes] tensor
+    onx = convert_sklearn(
+        model,
+        initial_types=[('input', FloatTensorType([None, n_features]))],
+        options={id(model): {'zipmap': False}}
+    )
+    with open(path, 'wb') as f:
+        f.write(onx.SerializeToString())
+    print(f"ONNX model exported to: {path} (set model_path in settings.json to use it)")
+    return True
+
 def preprocess_and_train():
     """Loads the NF-UNSW-NB15 dataset, preprocesses it, and trains a lightweight RF model."""
     try:
@@ -31,16 +55,12 @@ def preprocess_and_train():
 
         print(f"Loading dataset from: {DATASET_PATH}")
         
-        # --- FIX: Changed separator to comma (',') which the debug output confirmed ---
-        df = pd.read_csv(DATASET_PATH, sep=',', low_memory=False, skipinitialspace=True)
-        
-        # --- DEBUG: Show actual columns found in CSV ---
-        print("\n--- DEBUG: Columns found after loading CSV ---")
-        print(df.columns.tolist())
+        # --- DEBUG: Show actual columns found in CSV (header only) ---
+        header = pd.read_csv(DATASET_PATH, sep=',', nrows=0, skipinitialspace=True).columns
+        print("\n--- DEBUG: Columns found in CSV ---")
+        print(header.tolist())
         print("-------------------------------------------\n")
 
-        # --- 1. Feature Mapping and Cleaning ---
-        
         # Map original column names to the names the sniffer expects.
         rename_map = {
             'IN_BYTES': 'size',             # Packet size proxy
@@ -49,6 +69,18 @@ def preprocess_and_train():
             'PROTOCOL': 'protocol_num',     # Protocol number
             'TCP_FLAGS': 'tcp_flags_val'    # TCP flags value
         }
+
+        # --- FIX: Changed separator to comma (',') which the debug output confirmed ---
+        # Only the mapped feature columns and the label are parsed; the rest of the flow record is skipped.
+        # Numeric columns keep inferred dtypes, since they are coerced (errors='coerce') below anyway.
+        wanted = set(rename_map) | {'Attack'}
+        df = pd.read_csv(
+            DATASET_PATH, sep=',', skipinitialspace=True,
+            usecols=[col for col in header if col in wanted],
+            dtype={'Attack': 'category'}  # A handful of attack names repeated across every row
+        )
+
+        # --- 1. Feature Mapping and Cleaning ---
         
         # Filter map to include only columns present in the DataFrame
         actual_rename_map = {k: v for k, v in rename_map.items() if k in df.columns}
@@ -65,24 +97,25 @@ def preprocess_and_train():
         # 2a. TCP Flags 
         if 'tcp_flags_val' in df.columns:
             # Defensive conversion: Ensure it's numeric before bitwise operations
-            df['tcp_flags_val'] = pd.to_numeric(df['tcp_flags_val'], errors='coerce').fillna(0).astype(int)
+            flags = pd.to_numeric(df['tcp_flags_val'], errors='coerce').fillna(0).astype(int).to_numpy()
+            df['tcp_flags_val'] = flags
             # Bit 2 (0x02) is SYN, Bit 4 (0x10) is ACK
-            df['tcp_syn_flag'] = np.where((df['tcp_flags_val'] & 0x02) > 0, 1, 0)
-            df['tcp_ack_flag'] = np.where((df['tcp_flags_val'] & 0x10) > 0, 1, 0)
+            df['tcp_syn_flag'] = ((flags & 0x02) != 0).astype(np.uint8)
+            df['tcp_ack_flag'] = ((flags & 0x10) != 0).astype(np.uint8)
         else:
             df['tcp_syn_flag'] = 0
             df['tcp_ack_flag'] = 0
 
         # 2b. Protocol One-Hot Encoding
         if 'protocol_num' in df.columns:
-            df['protocol_num'] = pd.to_numeric(df['protocol_num'], errors='coerce').fillna(-1).astype(int)
-            df['protocol_TCP'] = np.where(df['protocol_num'] == 6, 1, 0) # TCP
-            df['protocol_UDP'] = np.where(df['protocol_num'] == 17, 1, 0) # UDP
-            df['protocol_ICMP'] = np.where(df['protocol_num'] == 1, 1, 0) # ICMP
+            proto = pd.to_numeric(df['protocol_num'], errors='coerce').fillna(-1).astype(int).to_numpy()
+            df['protocol_num'] = proto
+            # All three columns from one broadcast comparison against (6, 17, 1)
+            onehot = (proto[:, None] == np.array(list(PROTOCOL_ONEHOT.values()))).astype(np.uint8)
+            df[list(PROTOCOL_ONEHOT)] = onehot
         else:
-            df['protocol_TCP'] = 0
-            df['protocol_UDP'] = 0
-            df['protocol_ICMP'] = 0
+            for col in PROTOCOL_ONEHOT:
+                df[col] = 0
             
         # 2c. Placeholder Features (Filling in values for features existing only in the sniffer)
         df['ip_header_len'] = 20    
@@ -96,7 +129,7 @@ def preprocess_and_train():
         # Directly target the confirmed 'Attack' column for the binary label
         if 'Attack' in df.columns:
             # The 'Attack' column may be string ('Benign' for Normal, others for Attack)
-            y = df['Attack'].apply(lambda x: 0 if x == 'Benign' else 1).astype(int)
+            y = (df['Attack'] != 'Benign').astype(int)
         else:
             print("CRITICAL: The required binary label column 'Attack' was not found in the dataset.")
             print("Please confirm the name of the column containing the 0/1 attack label.")
@@ -109,22 +142,23 @@ def preprocess_and_train():
         y = y.loc[df_sampled.index] # Align labels with sampled data
         df = df_sampled # Use sampled data going forward
         
-        # Create final feature matrix X, ensuring correct order and presence of all 11 SNIFFER_FEATURES
-        X_aligned = pd.DataFrame(0, index=df.index, columns=SNIFFER_FEATURES)
-        for col in X_aligned.columns:
-            # Check if the feature was generated from the CSV data
-            if col in df.columns and col not in ['Attack']:
-                X_aligned[col] = df[col]
-            # Handle placeholder columns that were set as single values
-            elif col in ['ip_header_len', 'ip_ttl', 'tcp_window']:
-                 X_aligned[col] = df[col]
-        
-        X = X_aligned.values
+        # Create final feature matrix X, ensuring correct order and presence of all 11 SNIFFER_FEATURES.
+        # Filled column by column into one float32 array (the tree threshold dtype); all features are
+        # small integers, exactly representable in float32. Features missing from df stay 0.
+        X = np.zeros((len(df), len(SNIFFER_FEATURES)), dtype=np.float32)
+        for i, col in enumerate(SNIFFER_FEATURES):
+            if col in df.columns:
+                X[:, i] = df[col].to_numpy(dtype=np.float32)
         
         # 5. Train the Model
         print(f"Starting training on {len(X)} samples...")
-        model = RandomForestClassifier(n_estimators=10, random_state=42, n_jobs=-1)
-        model.fit(X, y)
+        # Bounded trees: unlimited depth grows leaves down to single samples, which bloats the model
+        # file and lengthens every root-to-leaf walk at predict time
+        model = RandomForestClassifier(
+            n_estimators=10, max_depth=12, max_features='sqrt', min_samples_leaf=20,
+            random_state=42, n_jobs=-1
+        )
+        model.fit(X, y.to_numpy())
         
         # 6. Save the Model
         final_payload = {
@@ -132,8 +166,11 @@ def preprocess_and_train():
             'features': SNIFFER_FEATURES 
         }
         
-        with open(MODEL_PATH, 'wb') as f:
-            pickle.dump(final_payload, f)
+        # joblib stores the tree arrays as raw NumPy buffers; left uncompressed so MLEngine can
+        # memory-map them (mmap_mode='r' is silently ignored for compressed files)
+        joblib.dump(final_payload, MODEL_PATH)
+
+        export_onnx(model, X.shape[1])
             
         print("-" * 50)
         print(f"SUCCESS: Lightweight ML model trained using your flow data features saved to: {MODEL_PATH}")
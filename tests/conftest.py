@@ -4,6 +4,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 import pytest
 from backend.api import app
+from backend.ml_engine import MLEngine
 
 @pytest.fixture
 def client():
@@ -11,3 +12,8 @@ def client():
     app.config['TESTING'] = True
     with app.test_client() as client:
         yield client
+
+@pytest.fixture(scope="module")
+def engine():
+    """ML engine fixture, loaded once per test module (loading the model dominates test time)."""
+    return MLEngine()
@@ -4,7 +4,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 import pytest
 import json
-from backend.api import app, load_config
+from backend.api import load_config
 
 def test_load_config():
     """Test configuration loading."""
@@ -16,82 +16,236 @@ def test_load_config():
 
 def test_api_get_live_traffic(client):
     """Test the live traffic endpoint."""
-    with app.test_client() as client:
-        response = client.get('/api/traffic/live')
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert 'logs' in data
-        assert 'role' in data
-        assert 'sensitivity' in data
+    response = client.get('/api/traffic/live')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert 'logs' in data
+    assert 'role' in data
+    assert 'sensitivity' in data
 
 def test_api_get_alerts_history(client):
     """Test the alerts history endpoint."""
-    with app.test_client() as client:
-        response = client.get('/api/alerts/history')
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert 'alerts' in data
+    response = client.get('/api/alerts/history')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert 'alerts' in data
 
 def test_api_get_analytics_trends(client):
     """Test the analytics trends endpoint."""
-    with app.test_client() as client:
-        response = client.get('/api/analytics/trends')
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert 'classification_stats' in data
-        assert 'protocol_stats' in data
-        assert 'ip_stats' in data
+    response = client.get('/api/analytics/trends')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert 'classification_stats' in data
+    assert 'protocol_stats' in data
+    assert 'ip_stats' in data
 
 def test_api_get_packet_details_not_found(client):
     """Test packet details endpoint with non-existent packet."""
-    with app.test_client() as client:
-        response = client.get('/api/packet/99999')
-        assert response.status_code == 404
-        data = json.loads(response.data)
-        assert 'details' in data
-        assert data['details'] is None
-
-def test_api_settings_post(client):
-    """Test settings update endpoint."""
-    with app.test_client() as client:
-        payload = {
-            'sensitivity': 0.7,
-            'role': 'Admin',
-            'theme': 'Dark'
-        }
-        response = client.post('/api/settings',
-                              data=json.dumps(payload),
-                              content_type='application/json')
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert 'message' in data
+    response = client.get('/api/packet/99999')
+    assert response.status_code == 404
+    data = json.loads(response.data)
+    assert 'details' in data
+    assert data['details'] is None
+
+def test_api_settings_post(client, tmp_path, monkeypatch):
+    """Test settings update endpoint (writes to a temporary settings file)."""
+    from backend import api
+    settings_file = tmp_path / 'settings.json'
+    settings_file.write_text(json.dumps({'db_path': 'storage/logs.db', 'sensitivity': 0.5}))
+    monkeypatch.setattr(api, 'CONFIG_FILE', str(settings_file))
+    monkeypatch.setattr(api, 'CONFIG', dict(api.CONFIG))
+    payload = {
+        'sensitivity': 0.7,
+        'role': 'Admin',
+        'theme': 'Dark'
+    }
+    response = client.post('/api/settings',
+                          data=json.dumps(payload),
+                          content_type='application/json')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert 'message' in data
+    # Only keys from the file or the request are saved, not the backend defaults
+    saved = json.loads(settings_file.read_text())
+    assert saved == {'db_path': 'storage/logs.db', 'sensitivity': 0.7, 'role': 'Admin', 'theme': 'Dark'}
 
 def test_api_alerts_action_false_positive(client):
     """Test alerts action endpoint for false positive."""
-    with app.test_client() as client:
-        payload = {
-            'alert_id': 1,
-            'action': 'false_positive',
-            'src_ip': '192.168.1.1'
-        }
-        response = client.post('/api/alerts/action',
-                              data=json.dumps(payload),
-                              content_type='application/json')
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert 'message' in data
+    payload = {
+        'alert_id': 1,
+        'action': 'false_positive',
+        'src_ip': '192.168.1.1'
+    }
+    response = client.post('/api/alerts/action',
+                          data=json.dumps(payload),
+                          content_type='application/json')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert 'message' in data
 
 def test_api_alerts_action_block_ip(client):
     """Test alerts action endpoint for block IP."""
-    with app.test_client() as client:
-        payload = {
-            'alert_id': 2,
-            'action': 'block_ip',
-            'src_ip': '192.168.1.2'
-        }
-        response = client.post('/api/alerts/action',
-                              data=json.dumps(payload),
-                              content_type='application/json')
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert 'message' in data
+    payload = {
+        'alert_id': 2,
+        'action': 'block_ip',
+        'src_ip': '192.168.1.2'
+    }
+    response = client.post('/api/alerts/action',
+                          data=json.dumps(payload),
+                          content_type='application/json')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert 'message' in data
+
+def test_get_geolocation_private_ip_skips_lookup():
+    """Test that private IPs resolve locally without querying the GeoIP database."""
+    from unittest.mock import patch, MagicMock
+    from backend import api
+    with patch.object(api, 'GEO_READER', MagicMock()) as mock_reader:
+        location = api.get_geolocation('192.168.1.10')
+        assert location['address'] == 'Local Network'
+        mock_reader.get.assert_not_called()
+
+def test_get_geolocation_caches_public_ip():
+    """Test that repeated lookups for the same IP query the GeoIP database once."""
+    from unittest.mock import patch, MagicMock
+    from backend import api
+    api._lookup_geolocation.cache_clear()
+    record = {
+        'location': {'latitude': 1.0, 'longitude': 2.0},
+        'city': {'names': {'en': 'Somewhere'}},
+        'country': {'names': {'en': 'Nowhere'}}
+    }
+    mock_reader = MagicMock()
+    mock_reader.get.return_value = record
+    with patch.object(api, 'GEO_READER', mock_reader):
+        first = api.get_geolocation('8.8.8.8')
+        second = api.get_geolocation('8.8.8.8')
+        assert first == {'lat': 1.0, 'lon': 2.0, 'address': 'Somewhere, Nowhere'}
+        assert first == second
+        assert mock_reader.get.call_count == 1
+    api._lookup_geolocation.cache_clear()
+
+def test_api_ingest_caps_live_log(client):
+    """Test that batch ingestion keeps only the most recent MAX_LIVE_PACKETS entries."""
+    from backend import api
+    logs = [
+        {'timestamp': i, 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'protocol': 'TCP'}
+        for i in range(api.MAX_LIVE_PACKETS + 10)
+    ]
+    response = client.post('/api/traffic/ingest',
+                          data=json.dumps({'logs': logs}),
+                          content_type='application/json')
+    assert response.status_code == 201
+    data = json.loads(client.get('/api/traffic/live').data)
+    assert len(data['logs']) == api.MAX_LIVE_PACKETS
+    assert data['logs'][-1]['id'] == api.LAST_PACKET_ID
+
+def test_api_traffic_map_cached_until_ingest(client):
+    """Test that the map is only regenerated after new packets are ingested."""
+    from unittest.mock import patch
+    from backend import api
+    with patch.object(api, 'generate_traffic_map', return_value='<html>map</html>') as mock_generate:
+        api._MAP_CACHE.update({"id": -1, "html": None})
+        assert client.get('/api/traffic/map').status_code == 200
+        assert client.get('/api/traffic/map').status_code == 200
+        assert mock_generate.call_count == 1
+
+        client.post('/api/traffic/ingest',
+                    data=json.dumps({'timestamp': 0, 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2'}),
+                    content_type='application/json')
+        client.get('/api/traffic/map')
+        assert mock_generate.call_count == 2
+    api._MAP_CACHE.update({"id": -1, "html": None})
+
+def test_api_live_traffic_omits_raw_data(client):
+    """Test that raw packet bytes are only returned by the packet details endpoint."""
+    from backend import api
+    client.post('/api/traffic/ingest',
+                data=json.dumps({'timestamp': 0, 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'raw_data': 'AAEC'}),
+                content_type='application/json')
+    packet_id = api.LAST_PACKET_ID
+
+    live = json.loads(client.get('/api/traffic/live').data)
+    assert all('raw_data' not in log for log in live['logs'])
+
+    details = json.loads(client.get(f'/api/packet/{packet_id}').data)['details']
+    assert details['raw_data'] == 'AAEC'
+
+def test_api_ingest_msgpack_batch(client):
+    """Test that msgpack batches are ingested and raw bytes are served as base64."""
+    import msgpack
+    from backend import api
+    payload = {'logs': [{'timestamp': 0, 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'raw_data': b'\x00\x01\x02'}]}
+    response = client.post('/api/traffic/ingest',
+                           data=msgpack.packb(payload, use_bin_type=True),
+                           content_type='application/msgpack')
+    assert response.status_code == 201
+    packet_id = json.loads(response.data)['ids'][0]
+
+    details = json.loads(client.get(f'/api/packet/{packet_id}').data)['details']
+    assert details['raw_data'] == 'AAEC'
+
+def test_api_ingest_simulated_alerts_opt_in(client):
+    """Test that synthetic alerts are only raised when simulate_alerts is enabled."""
+    from unittest.mock import patch
+    from backend import api
+    logs = [{'timestamp': i, 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2'} for i in range(4)]
+
+    with patch.dict(api.CONFIG, {'simulate_alerts': False}):
+        alerts_before = len(api.ALERT_HISTORY)
+        client.post('/api/traffic/ingest', data=json.dumps({'logs': logs}),
+                    content_type='application/json')
+        assert len(api.ALERT_HISTORY) == alerts_before
+
+    with patch.dict(api.CONFIG, {'simulate_alerts': True}):
+        client.post('/api/traffic/ingest', data=json.dumps({'logs': logs}),
+                    content_type='application/json')
+        assert len(api.ALERT_HISTORY) == alerts_before + 2
+
+def test_api_traffic_stream_pushes_new_packets(client):
+    """Test that the traffic stream sends packets newer than ?since as JSON lines."""
+    from backend import api
+    client.post('/api/traffic/ingest',
+                data=json.dumps({'timestamp': 0, 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'raw_data': 'AAEC'}),
+                content_type='application/json')
+    packet_id = api.LAST_PACKET_ID
+
+    response = client.get(f'/api/traffic/stream?since={packet_id - 1}', buffered=False)
+    assert response.mimetype == 'application/x-ndjson'
+    chunks = iter(response.response)
+    assert next(chunks) == b'\n'  # Sent at once so the client sees the stream open
+    chunk = next(chunks)
+    response.close()
+
+    logs = [json.loads(line) for line in chunk.splitlines() if line.strip()]
+    assert [log['id'] for log in logs] == [packet_id]
+    assert 'raw_data' not in logs[0]
+
+def test_api_dashboard_bulk_sends_only_changed_sections(client):
+    """Test that the bulk endpoint returns new packets and omits alerts/trends whose version matches."""
+    from unittest.mock import patch
+    from backend import api
+    client.post('/api/traffic/ingest',
+                data=json.dumps({'timestamp': 0, 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'raw_data': 'AAEC'}),
+                content_type='application/json')
+    packet_id = api.LAST_PACKET_ID
+
+    data = client.get(f'/api/dashboard/bulk?traffic_since={packet_id - 1}').get_json()
+    assert [log['id'] for log in data['traffic']['logs']] == [packet_id]
+    assert 'raw_data' not in data['traffic']['logs'][0]
+    assert 'alerts' in data['alerts'] and 'classification_stats' in data['trends']
+
+    versions = f"alerts_version={data['alerts']['version']}&trends_version={data['trends']['version']}"
+    unchanged = client.get(f'/api/dashboard/bulk?include=alerts,trends&{versions}').get_json()
+    assert 'traffic' not in unchanged
+    assert unchanged['alerts'] == {'version': data['alerts']['version']}
+    assert unchanged['trends'] == {'version': data['trends']['version']}
+
+    # An odd packet ID raises a simulated alert, which changes both versions
+    logs = [{'timestamp': i, 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2'} for i in range(2)]
+    with patch.dict(api.CONFIG, {'simulate_alerts': True}):
+        client.post('/api/traffic/ingest', data=json.dumps({'logs': logs}), content_type='application/json')
+    changed = client.get(f'/api/dashboard/bulk?include=alerts,trends&{versions}').get_json()
+    assert changed['alerts']['alerts'][-1]['alert_id'] == api.LAST_ALERT_ID
+    assert 'classification_stats' in changed['trends']
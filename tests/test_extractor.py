@@ -0,0 +1,56 @@
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from scapy.all import Ether, Dot1Q, IP, TCP, UDP, ARP
+from backend.extractor import extract_features, packet_to_log_data
+
+def test_extract_features_tcp_syn():
+    """Test feature extraction for an Ethernet TCP SYN packet."""
+    pkt = Ether() / IP(src="192.168.1.1", dst="8.8.8.8", ttl=128) / TCP(dport=80, flags="S")
+    features = extract_features(pkt)
+    assert features == [6, len(pkt), 128, 1]
+
+def test_extract_features_counts_critical_flags_only():
+    """Test that only SYN, ACK, FIN and RST are counted (PSH/URG ignored)."""
+    pkt = IP(ttl=64) / TCP(flags="FSRPAU")
+    features = extract_features(pkt)
+    assert features == [6, len(pkt), 64, 4]
+
+def test_extract_features_flags_count_matches_scapy():
+    """Test the flags popcount against Scapy's S + A + F + R for every flags byte."""
+    for flags in range(256):
+        pkt = IP() / TCP(flags=flags)
+        tcp_flags = pkt[TCP].flags
+        expected = tcp_flags.S + tcp_flags.A + tcp_flags.F + tcp_flags.R
+        assert extract_features(pkt)[3] == expected
+
+def test_extract_features_udp():
+    """Test feature extraction for a UDP packet (no flags)."""
+    pkt = Ether() / IP(ttl=32) / UDP(dport=53)
+    features = extract_features(pkt)
+    assert features == [17, len(pkt), 32, 0]
+
+def test_extract_features_vlan_tagged():
+    """Test feature extraction for a VLAN-tagged packet."""
+    pkt = Ether() / Dot1Q(vlan=10) / IP(ttl=64) / TCP(flags="SA")
+    features = extract_features(pkt)
+    assert features == [6, len(pkt), 64, 2]
+
+def test_extract_features_non_ip():
+    """Test that non-IP packets are ignored."""
+    assert extract_features(Ether() / ARP()) is None
+
+def test_packet_to_log_data_from_raw_bytes():
+    """Test that log data is read from the pre-serialized packet bytes."""
+    pkt = Ether() / IP(src="192.168.1.1", dst="8.8.8.8") / TCP(flags="SA")
+    raw = bytes(pkt)
+    log_data = packet_to_log_data(pkt, raw, 1, 0.875)
+    assert log_data['src_ip'] == "192.168.1.1"
+    assert log_data['dst_ip'] == "8.8.8.8"
+    assert log_data['protocol'] == 'TCP'
+    assert log_data['flags'] == 'SA'
+    assert log_data['size'] == len(raw)
+    assert log_data['classification'] == 'Anomaly'
+    assert log_data['confidence'] == '0.8750'
@@ -1,20 +1,27 @@
 import pytest
 from PyQt5.QtWidgets import QApplication
-from frontend.ui_main import NIDSApp
+from frontend.ui_main import NIDSApp, load_config
 import sys
-import time
 from unittest.mock import patch, MagicMock
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def app():
     app = QApplication(sys.argv)
     yield app
     app.quit()
 
-def test_live_traffic_monitor_tab(app):
-    # Mock the API response
-    mock_response = MagicMock()
-    mock_response.json.return_value = [
+@pytest.fixture
+def window(app):
+    """A fresh NIDSApp with its poll timer stopped and no real network requests."""
+    with patch.object(NIDSApp, '_send_request'), patch.object(NIDSApp, '_open_traffic_stream'):
+        window = NIDSApp()
+        window.timer.stop()
+        yield window
+        window.close()
+
+def test_live_traffic_monitor_tab(window):
+    # Sample API payload
+    logs = [
         {
             "id": 1,
             "timestamp": "2023-10-01T12:00:00Z",
@@ -27,27 +34,293 @@ def test_live_traffic_monitor_tab(app):
         }
     ]
 
-    with patch('requests.get', return_value=mock_response):
-        window = NIDSApp()
-        window.show()
+    window.show()
 
-        # Navigate to Live Traffic Monitor tab
-        window.tabs.setCurrentIndex(0)  # Assuming first tab is Live Traffic Monitor
+    # Navigate to Live Traffic Monitor tab
+    window.tabs.setCurrentIndex(0)  # Assuming first tab is Live Traffic Monitor
 
-        # Allow some time for data to load and update
-        time.sleep(1)
+    # Deliver the data synchronously, as the reply handler would
+    window._update_live_traffic_data({"logs": logs, "role": "Analyst", "sensitivity": 0.5}, since=0)
 
-        # Manually trigger update_ui_data to populate table
-        window._update_live_traffic_data({"logs": mock_response.json.return_value, "role": "Analyst", "sensitivity": 0.5})
+    # Check if the traffic table has rows populated
+    traffic_table = window.traffic_table
+    row_count = traffic_table.model().rowCount()
+    assert row_count > 0, "Live Traffic Monitor table should have rows populated"
 
-        # Check if the traffic table has rows populated
-        traffic_table = window.traffic_table
-        row_count = traffic_table.rowCount()
-        assert row_count > 0, "Live Traffic Monitor table should have rows populated"
+    # Check if status label shows OK
+    status_text = window.status_label.text()
+    assert "OK" in status_text, "Status should show OK"
 
-        # Check if status label shows OK
-        status_text = window.status_label.text()
-        assert "OK" in status_text, "Status should show OK"
+def test_poll_skipped_while_previous_in_flight(window):
+    """Test that a poll is not dispatched again until its previous request returns."""
+    with patch.object(window, '_send_request') as mock_start, \
+            patch.object(window, '_open_traffic_stream'):  # Stream down: traffic is polled
+        window.update_ui_data()
+        assert mock_start.call_count == 1  # One bulk request for traffic and alerts
+        assert "include=alerts,traffic&" in mock_start.call_args.args[0]
 
-        # Close the window
-        window.close()
+        window.update_ui_data()
+        assert mock_start.call_count == 1  # Still in flight, tick skipped
+
+        window._finish_api_call('Dashboard', lambda data: None, {})
+        window.update_ui_data()
+        assert mock_start.call_count == 2  # Dispatched again once the reply arrived
+
+def test_dashboard_bulk_reply_dispatches_changed_sections(window):
+    """Test that bulk sections reach their tab handlers and unchanged sections only update versions."""
+    with patch.object(window, '_update_live_traffic_data') as mock_traffic, \
+            patch.object(window, '_update_alert_data') as mock_alerts, \
+            patch.object(window, '_update_analytics_data') as mock_trends:
+        window._update_dashboard_data({
+            "traffic": {"logs": []},
+            "alerts": {"version": "a-1", "alerts": []},
+            "trends": {"version": "a-7"}
+        })
+        mock_traffic.assert_called_once_with({"logs": []}, since=0)
+        mock_alerts.assert_called_once_with({"version": "a-1", "alerts": []})
+        mock_trends.assert_not_called()  # Unchanged since trends_version
+    assert (window._alerts_version, window._trends_version) == ("a-1", "a-7")
+
+    with patch.object(window, '_send_request') as mock_send, patch.object(window, '_open_traffic_stream'):
+        window.update_ui_data()
+    assert "alerts_version=a-1" in mock_send.call_args.args[0]
+
+def test_polling_backs_off_while_idle_and_pauses_when_minimized(window):
+    """Test that the poll interval doubles on idle replies, snaps back on new data, and skips while minimized."""
+    from frontend.ui_main import POLL_INTERVAL_MS, POLL_MAX_INTERVAL_MS, POLL_IDLE_TICKS
+    for _ in range(POLL_IDLE_TICKS):
+        window._update_dashboard_data({"alerts": {"version": "a-1"}})
+    assert window.timer.interval() == 2 * POLL_INTERVAL_MS
+
+    for _ in range(10 * POLL_IDLE_TICKS):
+        window._note_poll_activity(False)
+    assert window.timer.interval() == POLL_MAX_INTERVAL_MS
+
+    window._update_dashboard_data({"alerts": {"version": "a-2", "alerts": []}})
+    assert window.timer.interval() == POLL_INTERVAL_MS
+
+    with patch.object(window, 'isMinimized', return_value=True), \
+            patch.object(window, '_send_request') as mock_send:
+        window.update_ui_data()
+    mock_send.assert_not_called()
+
+def test_load_config_reloads_only_when_file_changes(tmp_path):
+    """Test that settings are re-read after the file's mtime changes."""
+    import os
+    config_file = tmp_path / "settings.json"
+    config_file.write_text('{"sensitivity": 0.3}')
+    assert load_config(str(config_file)).sensitivity == 0.3
+
+    config_file.write_text('{"sensitivity": 0.7}')
+    stat = os.stat(config_file)
+    os.utime(config_file, (stat.st_atime, stat.st_mtime + 10))
+    assert load_config(str(config_file)).sensitivity == 0.7
+
+def test_live_traffic_table_appends_only_new_rows(window):
+    """Test that the traffic table appends unseen packets and trims to MAX_TRAFFIC_ROWS."""
+    from frontend.ui_main import MAX_TRAFFIC_ROWS
+    logs = [{"id": i, "src_ip": "10.0.0.1", "classification": "Normal"} for i in range(1, 4)]
+    window._update_live_traffic_data({"logs": logs}, since=0)
+    window._update_live_traffic_data({"logs": logs + [{"id": 4, "classification": "Anomaly"}]}, since=0)
+    assert window.traffic_model.rowCount() == 4
+    assert window.traffic_model.index(3, 0).data() == "4"
+
+    logs = [{"id": i} for i in range(5, 5 + MAX_TRAFFIC_ROWS)]
+    window._update_live_traffic_data({"logs": logs}, since=4)
+    assert window.traffic_model.rowCount() == MAX_TRAFFIC_ROWS
+    assert window.traffic_model.index(0, 0).data() == "5"
+
+def test_live_traffic_late_poll_does_not_look_like_a_restart(window):
+    """Test that a bulk reply overtaken by the stream is dropped, while resent old IDs reset the table."""
+    def ids():
+        return [window.traffic_model.index(row, 0).data() for row in range(window.traffic_model.rowCount())]
+
+    # Stream and bulk poll both opened with since=0; the stream's lines arrive first
+    window._update_live_traffic_data({"logs": [{"id": i} for i in range(1, 11)]}, since=0)
+    window._update_live_traffic_data({"logs": [{"id": i} for i in range(1, 9)]}, since=0)
+    window._update_live_traffic_data({"logs": [{"id": 11}, {"id": 12}]}, since=0)
+    assert ids() == [str(i) for i in range(1, 13)]
+
+    # After an API restart the server resends IDs at or below the since it was asked for
+    window._update_live_traffic_data({"logs": [{"id": 1}, {"id": 2}]}, since=12)
+    assert ids() == ["1", "2"]
+
+def test_alert_table_model_placeholder_and_rows(window):
+    """Test that the alert model shows a placeholder when empty and one row per alert."""
+    window._update_alert_data({"alerts": []})  # The model is already empty at startup
+    assert window.alert_model.rowCount() == 1
+    assert window.alert_model.index(0, 0).data() == "No alerts to display"
+    assert window.alert_table.columnSpan(0, 0) == window.alert_model.columnCount()
+
+    alerts = [{"alert_id": 1, "packet_id": 3, "timestamp": 0, "src_ip": "10.0.0.1",
+               "attack_type": "DDoS", "confidence": "0.9"}]
+    window._update_alert_data({"alerts": alerts})
+    assert window.alert_model.rowCount() == 1
+    assert window.alert_model.index(0, 5).data() == "0.90"
+    assert window.alert_table.indexWidget(window.alert_model.index(0, 6)) is None  # Buttons are painted
+    assert window.alert_table.columnSpan(0, 0) == 1
+
+    window._update_alert_data({"alerts": []})
+    assert window.alert_table.columnSpan(0, 0) == window.alert_model.columnCount()
+
+def test_alert_model_applies_only_the_difference(app):
+    """Test that a new alert list removes, inserts and refreshes rows instead of resetting."""
+    from frontend.ui_main import AlertModel
+    model = AlertModel()
+
+    def alert(aid, confidence=0.5):
+        return {"alert_id": aid, "packet_id": aid, "timestamp": 0, "src_ip": "10.0.0.1",
+                "attack_type": "DDoS", "confidence": confidence}
+
+    model.set_alerts([alert(1), alert(2), alert(3)])
+    events = []
+    model.modelReset.connect(lambda: events.append("reset"))
+    model.rowsRemoved.connect(lambda parent, first, last: events.append(("removed", first, last)))
+    model.rowsInserted.connect(lambda parent, first, last: events.append(("inserted", first, last)))
+    model.dataChanged.connect(lambda top, bottom: events.append(("changed", top.row())))
+
+    model.set_alerts([alert(1), alert(2), alert(3)])
+    assert events == []
+
+    model.set_alerts([alert(2), alert(3, 0.9), alert(4), alert(5)])
+    assert events == [("removed", 0, 0), ("inserted", 2, 3), ("changed", 1)]
+    assert [model.index(row, 0).data() for row in range(model.rowCount())] == ["2", "3", "4", "5"]
+    assert model.index(1, 5).data() == "0.90"
+
+    events.clear()
+    model.set_alerts([])
+    assert events == ["reset"]
+    assert model.index(0, 0).data() == AlertModel.PLACEHOLDER
+
+def test_alert_action_delegate_dispatches_clicks(window):
+    """Test that clicking a painted action button calls handle_alert_action for that row."""
+    from PyQt5.QtCore import Qt, QEvent, QPoint, QRect
+    from PyQt5.QtGui import QMouseEvent
+    from PyQt5.QtWidgets import QStyleOptionViewItem
+    alerts = [{"alert_id": 7, "packet_id": 3, "timestamp": 0, "src_ip": "10.0.0.9",
+               "attack_type": "DDoS", "confidence": 0.9}]
+    window._update_alert_data({"alerts": alerts})
+
+    delegate = window.alert_actions
+    option = QStyleOptionViewItem()
+    option.rect = QRect(0, 0, 120, 35)
+    index = window.alert_model.index(0, 6)
+    (fp_rect, _), (block_rect, _) = delegate.button_rects(option.rect)
+
+    def click(pos):
+        event = QMouseEvent(QEvent.MouseButtonRelease, pos, Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+        return delegate.editorEvent(event, window.alert_model, option, index)
+
+    with patch.object(window, 'handle_alert_action') as mock_action:
+        assert click(block_rect.center())
+        mock_action.assert_called_once_with(7, "block_ip", "10.0.0.9")
+        mock_action.reset_mock()
+        assert click(fp_rect.center())
+        mock_action.assert_called_once_with(7, "false_positive")
+        mock_action.reset_mock()
+        assert not click(QPoint(115, 2))  # Outside both buttons
+        mock_action.assert_not_called()
+
+def test_alert_action_delegate_clears_hover_off_column(window, app):
+    """Test that the button highlight is dropped when the mouse leaves the Action column."""
+    from PyQt5.QtCore import Qt, QEvent
+    from PyQt5.QtGui import QMouseEvent
+    from PyQt5.QtWidgets import QStyleOptionViewItem
+    alerts = [{"alert_id": 7, "packet_id": 3, "timestamp": 0, "src_ip": "10.0.0.9",
+               "attack_type": "DDoS", "confidence": 0.9}]
+    window.show()
+    window._update_alert_data({"alerts": alerts})
+
+    delegate = window.alert_actions
+    viewport = window.alert_table.viewport()
+    index = window.alert_model.index(0, 6)
+    option = QStyleOptionViewItem()
+    option.rect = window.alert_table.visualRect(index)
+    (fp_rect, _), _ = delegate.button_rects(option.rect)
+
+    def move(pos):
+        return QMouseEvent(QEvent.MouseMove, pos, Qt.NoButton, Qt.NoButton, Qt.NoModifier)
+
+    delegate.editorEvent(move(fp_rect.center()), window.alert_model, option, index)
+    assert delegate._hover == (0, "false_positive")
+
+    # Moving over another column of the table
+    app.sendEvent(viewport, move(window.alert_table.visualRect(window.alert_model.index(0, 0)).center()))
+    assert delegate._hover is None
+
+    # Leaving the viewport altogether
+    delegate.editorEvent(move(fp_rect.center()), window.alert_model, option, index)
+    app.sendEvent(viewport, QEvent(QEvent.Leave))
+    assert delegate._hover is None
+
+def test_analytics_charts_skip_unchanged_content(window):
+    """Test that an analytics chart is only re-rendered when its content changes."""
+    window._ensure_tab_built(2)  # Analytics tab is built on first activation
+    data = {"classification_stats": [["Normal", 3]], "protocol_stats": [["TCP", 3]], "ip_stats": []}
+
+    window._update_analytics_data(data)
+    with patch.object(window.classification_chart, 'setText') as mock_set_text, \
+            patch.object(window, '_render_bar_chart', wraps=window._render_bar_chart) as mock_render:
+        window._update_analytics_data(data)
+        mock_set_text.assert_not_called()
+        mock_render.assert_not_called()  # Unchanged stats are not even rendered
+
+        window._update_analytics_data({**data, "classification_stats": [["Normal", 4]]})
+        mock_set_text.assert_called_once()
+        mock_render.assert_called_once()
+
+def test_render_bar_chart_scales_bars(window):
+    """Test that bars scale to the largest count and all-zero stats render empty bars."""
+    lines = window._render_bar_chart([("TCP", 4), ("UDP", 1)], title="Protocol Traffic", scale=8).split("\n")
+    assert lines[0] == "<b>Protocol Traffic</b> (Last Hour):"
+    assert lines[-2:] == ["TCP".ljust(15) + " " + "\u2588" * 8 + " (4)", "UDP".ljust(15) + " " + "\u2588" * 2 + " (1)"]
+
+    zero = window._render_bar_chart([("0.0.0.0", 0)], title="Top Source IPs")
+    assert zero.endswith("0.0.0.0".ljust(15) + "  (0)")
+
+def test_packet_hex_view_formats_raw_bytes(window):
+    """Test that the Packet Inspector shows the JSON breakdown and raw_data as uppercase hex."""
+    import base64
+    window._ensure_tab_built(3)
+    details = {"id": 1, "classification": "Normal", "raw_data": base64.b64encode(b"\x00\xab\x10").decode()}
+
+    window.display_packet_details({"details": details})
+    assert window.hex_view.toPlainText() == "00 AB 10"
+    assert "Classification: Normal" in window.breakdown_view.toPlainText()
+    assert '"classification": "Normal"' in window.breakdown_view.toPlainText()
+
+    window.display_packet_details({"details": {**details, "raw_data": "not base64!"}})
+    assert window.hex_view.toPlainText().startswith("Error decoding raw data")
+
+def test_handle_reply_routes_json_and_errors(window):
+    """Test that finished network replies are parsed as JSON or reported as API errors."""
+    from PyQt5.QtNetwork import QNetworkReply
+    on_data, on_error = MagicMock(), MagicMock()
+
+    reply = MagicMock()
+    reply.error.return_value = QNetworkReply.NoError
+    reply.readAll.return_value = b'{"logs": []}'
+    window._pending_replies[reply] = (on_data, on_error)
+    window._handle_reply(reply)
+    on_data.assert_called_once_with({"logs": []})
+
+    reply.error.return_value = QNetworkReply.ConnectionRefusedError
+    reply.errorString.return_value = "Connection refused"
+    window._pending_replies[reply] = (on_data, on_error)
+    window._handle_reply(reply)
+    assert "Ensure the Flask API is running" in on_error.call_args[0][0]
+
+def test_traffic_stream_appends_complete_lines(window):
+    """Test that streamed JSON lines are appended as they arrive, across read boundaries."""
+    window._stream_reply = MagicMock()
+
+    window._stream_reply.readAll.return_value = b'\n{"id": 1, "classification": "Normal"}\n{"id": 2,'
+    window._read_traffic_stream()
+    assert window.traffic_model.rowCount() == 1
+
+    window._stream_reply.readAll.return_value = b' "classification": "Anomaly"}\n\n'
+    window._read_traffic_stream()
+    assert window.traffic_model.rowCount() == 2
+    assert window.traffic_model.index(1, 0).data() == "2"
+
+    window._stream_reply = None
@@ -6,15 +6,12 @@ import pytest
 import numpy as np
 from backend.ml_engine import MLEngine
 
-def test_ml_engine_initialization():
+def test_ml_engine_initialization(engine):
     """Test that ML engine initializes correctly."""
-    engine = MLEngine()
     assert engine.model is not None or engine.model is None  # Allow for missing model
 
-def test_ml_engine_predict():
+def test_ml_engine_predict(engine):
     """Test ML prediction with sample features."""
-    engine = MLEngine()
-
     # Test normal packet features
     features = [6, 60, 128, 1]  # TCP, length 60, TTL 128, 1 flag
     classification, confidence = engine.predict(features)
@@ -24,10 +21,8 @@ def test_ml_engine_predict():
     assert isinstance(confidence, float)
     assert 0.0 <= confidence <= 1.0
 
-def test_ml_engine_predict_anomaly():
+def test_ml_engine_predict_anomaly(engine):
     """Test ML prediction with potential anomaly features."""
-    engine = MLEngine()
-
     # Test anomaly packet features
     features = [6, 1400, 64, 4]  # TCP, length 1400, TTL 64, 4 flags
     classification, confidence = engine.predict(features)
@@ -37,11 +32,61 @@ def test_ml_engine_predict_anomaly():
     assert isinstance(confidence, float)
     assert 0.0 <= confidence <= 1.0
 
-def test_ml_engine_predict_invalid_features():
+def test_ml_engine_predict_invalid_features(engine):
     """Test ML prediction with invalid features."""
-    engine = MLEngine()
-
     # Test with None features
     classification, confidence = engine.predict(None)
     assert classification == 0
     assert confidence == 0.0
+
+def test_ml_engine_predict_batch(engine):
+    """Test batched ML prediction returns one result per feature vector."""
+    features_list = [[6, 60, 128, 1], [6, 1400, 64, 4], [17, 512, 64, 0]]
+    classifications, confidences = engine.predict_batch(features_list)
+
+    assert len(classifications) == len(features_list)
+    assert len(confidences) == len(features_list)
+    for classification, confidence in zip(classifications, confidences):
+        assert isinstance(classification, int)
+        assert 0 <= classification <= 1
+        assert isinstance(confidence, float)
+        assert 0.0 <= confidence <= 1.0
+
+def test_ml_engine_predict_batch_empty(engine):
+    """Test batched ML prediction with an empty batch."""
+    classifications, confidences = engine.predict_batch([])
+    assert classifications == []
+    assert confidences == []
+
+def test_ml_engine_predict_batch_array(engine):
+    """Test batched ML prediction accepts a 2-D NumPy feature buffer."""
+    buffer = np.array([[6, 60, 128, 1], [17, 512, 64, 0]], dtype=np.float32)
+    classifications, confidences = engine.predict_batch(buffer)
+    assert len(classifications) == 2
+    assert len(confidences) == 2
+
+    classifications, confidences = engine.predict_batch(buffer[:0])
+    assert classifications == []
+    assert confidences == []
+
+def test_ml_engine_onnx_model(tmp_path):
+    """Test that an exported .onnx model is served through onnxruntime."""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("skl2onnx")
+    import json
+    from sklearn.ensemble import RandomForestClassifier
+    from generate_model import export_onnx
+
+    X = np.array([[6, 60, 128, 1], [6, 1400, 64, 4]] * 10, dtype=float)
+    y = np.array([0, 1] * 10)
+    model = RandomForestClassifier(n_estimators=3, random_state=42).fit(X, y)
+
+    onnx_path = tmp_path / "rf_model.onnx"
+    assert export_onnx(model, X.shape[1], str(onnx_path))
+    config_path = tmp_path / "settings.json"
+    config_path.write_text(json.dumps({"model_path": str(onnx_path)}))
+
+    engine = MLEngine(config_path=str(config_path))
+    classifications, confidences = engine.predict_batch([[6, 60, 128, 1], [6, 1400, 64, 4]])
+    assert classifications == [0, 1]
+    assert all(0.0 <= c <= 1.0 for c in confidences)